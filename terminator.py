@@ -1,83 +1,141 @@
 # terminator_merged.py
 import os
 import sys
+import io
+import json
+import wave
+import hashlib
+import struct
+import pathlib
+import re
 import time
+import bisect
+import heapq
 import queue
+import itertools
+import collections
+import concurrent.futures
 import threading
 import subprocess
 import datetime
+import sqlite3
 import webbrowser
 import urllib.parse
+import importlib
 import tkinter as tk
 from tkinter import scrolledtext
 from dotenv import load_dotenv
-from PIL import Image, ImageTk, ImageGrab, ImageDraw
-import numpy as np
+# New import for email sending
+import smtplib
+from email.message import EmailMessage
+
+# -------------------------
+# Lazy dependency loading
+# -------------------------
+_import_profile = {}  # module name -> seconds spent importing it (first use only)
+_import_lock = threading.RLock()
+
+class LazyModule:
+    """
+    Stands in for a third-party module and imports it on first attribute access.
+    Optional modules are falsy when they can't be imported, so `if not psutil:`
+    keeps working as the "library not installed" check. Required modules raise
+    the original ImportError at first use instead of at startup.
+    """
+    def __init__(self, name, required=False):
+        self._name = name
+        self._required = required
+        self._module = None
+        self._error = None
+
+    def _load(self):
+        if self._module is None and self._error is None:
+            with _import_lock:
+                if self._module is None and self._error is None:
+                    t0 = time.perf_counter()
+                    try:
+                        self._module = importlib.import_module(self._name)
+                    except ImportError as e:
+                        self._error = e
+                    except Exception as e:
+                        # e.g. pyautogui raising on a machine without a display
+                        self._error = ImportError(f"{self._name} failed to import: {e}")
+                    _import_profile[self._name] = time.perf_counter() - t0
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._load()
+        if module is None:
+            raise self._error
+        return getattr(module, attr)
+
+    def __bool__(self):
+        module = self._load()
+        if module is None and self._required:
+            raise self._error
+        return module is not None
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "failed" if self._error else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+def lazy_import(name, required=False):
+    module = LazyModule(name, required)
+    _lazy_modules.append(module)
+    return module
+
+_lazy_modules = []
+
+Image = lazy_import("PIL.Image", required=True)
+ImageTk = lazy_import("PIL.ImageTk", required=True)
+ImageGrab = lazy_import("PIL.ImageGrab", required=True)
+ImageDraw = lazy_import("PIL.ImageDraw", required=True)
+np = lazy_import("numpy", required=True)
 
 # Added imports for new features
-import spacy
-import dateparser
-try:
-    import pyautogui
-except ImportError:
-    pyautogui = None
-import requests
+spacy = lazy_import("spacy", required=True)
+dateparser = lazy_import("dateparser", required=True)
+pyautogui = lazy_import("pyautogui")
 
 # New import for image generation
-try:
-    import replicate
-except ImportError:
-    replicate = None
-# New import for email sending
-import smtplib
-from email.message import EmailMessage
+replicate = lazy_import("replicate")
 
 # audio & speech
-try:
-    import pyaudio
-except ImportError:
-    pyaudio = None
-try:
-    import pvporcupine
-except ImportError:
-    pvporcupine = None
-import speech_recognition as sr
-import pyttsx3
-try:
-    import pygame
-except ImportError:
-    pygame = None
+pyaudio = lazy_import("pyaudio")
+pvporcupine = lazy_import("pvporcupine")
+sr = lazy_import("speech_recognition", required=True)
+pyttsx3 = lazy_import("pyttsx3", required=True)
+pygame = lazy_import("pygame")
+vosk = lazy_import("vosk")
+mutagen = lazy_import("mutagen")
 
 # optional utilities
-try:
-    import psutil
-except ImportError:
-    psutil = None
-
-try:
-    import requests
-except ImportError:
-    requests = None
-
-try:
-    import wikipedia
-except ImportError:
-    wikipedia = None
-
-try:
-    import pyperclip
-except ImportError:
-    pyperclip = None
+psutil = lazy_import("psutil")
+requests = lazy_import("requests")
+wikipedia = lazy_import("wikipedia")
+pyperclip = lazy_import("pyperclip")
 
 # optional Windows volume control via pycaw
-_pycaw_ok = False
-try:
-    from comtypes import CLSCTX_ALL
-    from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-    import comtypes
-    _pycaw_ok = True
-except ImportError:
-    _pycaw_ok = False
+comtypes = lazy_import("comtypes")
+pycaw = lazy_import("pycaw.pycaw")
+
+def import_profile_report():
+    """Import every lazy dependency (plus the spaCy model) and return per-module cost, slowest first."""
+    for module in _lazy_modules:
+        module._load()
+    t0 = time.perf_counter()
+    try:
+        load_nlp()
+        _import_profile["spacy model en_core_web_sm"] = time.perf_counter() - t0
+    except Exception as e:
+        _import_profile[f"spacy model en_core_web_sm (failed: {e})"] = time.perf_counter() - t0
+    failed = {m._name for m in _lazy_modules if m._error is not None}
+    lines = ["Import profile (first importer pays for shared sub-dependencies):"]
+    for name, seconds in sorted(_import_profile.items(), key=lambda kv: -kv[1]):
+        note = "  [not installed]" if name in failed else ""
+        lines.append(f"  {seconds * 1000:8.1f} ms  {name}{note}")
+    lines.append(f"  {sum(_import_profile.values()) * 1000:8.1f} ms  total")
+    return "\n".join(lines)
 
 # -------------------------
 # Configuration
@@ -87,18 +145,59 @@ PICOVOICE_ACCESS_KEY = os.getenv("PICOVOICE_ACCESS_KEY")
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 REPLICATE_API_TOKEN = os.getenv("REPLICATE_API_TOKEN")
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL") or "https://api.openweathermap.org"
+NEWS_API_BASE_URL = os.getenv("NEWS_API_BASE_URL") or "https://newsapi.org"
+HTTP_CACHE_TTLS = {"weather": 10 * 60, "news": 15 * 60}  # seconds, per endpoint
+FAVOURITE_CITIES = [c.strip() for c in (os.getenv("FAVOURITE_CITIES") or os.getenv("HOME_CITY") or "").split(",") if c.strip()]
+PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL") or 10 * 60)  # seconds between background refreshes
+PREFETCH_MAX_AGE = int(os.getenv("PREFETCH_MAX_AGE") or 30 * 60)  # older warm data falls back to a live fetch
 WAKE_KEYWORDS = ["terminator"]
 
 # Email Configuration
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
 EMAIL_APP_PASSWORD = os.getenv("EMAIL_APP_PASSWORD")
+SMTP_HOST = os.getenv("SMTP_HOST") or "smtp.gmail.com"
+SMTP_PORT = int(os.getenv("SMTP_PORT") or 465)
+SMTP_SECURITY = (os.getenv("SMTP_SECURITY") or "ssl").lower()  # ssl | starttls | none
+EMAIL_OUTBOX_DIR = os.getenv("EMAIL_OUTBOX_DIR") or os.path.expanduser("~/.terminator_outbox")
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS") or 6)
 
 MUSIC_DIR = os.getenv("MUSIC_DIR") or os.path.expanduser(r"~\\Music")
 AUDIO_EXTS = (".mp3", ".wav", ".ogg")
 
 LOGO_FILENAMES = ["terminator-logoo.png", "C:/Users/jeeva/OneDrive/Desktop/terminator/terminator-logoo.png"]
 
-NOTES_FILE = os.path.expanduser("~/terminator_notes.txt")
+MUSIC_DB = os.getenv("MUSIC_DB") or os.path.expanduser("~/.terminator_music.sqlite3")
+NOTES_FILE = os.path.expanduser("~/terminator_notes.txt")  # legacy text notes, imported once into NOTES_DB
+NOTES_DB = os.getenv("NOTES_DB") or os.path.expanduser("~/.terminator_notes.sqlite3")
+APP_CACHE_FILE = os.getenv("APP_CACHE_FILE") or os.path.expanduser("~/.terminator_app_cache.json")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR") or os.path.expanduser("~/.terminator_tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES") or 16 * 1024 * 1024)
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES") or 128 * 1024 * 1024)
+TTS_CACHE_MIN_USES = int(os.getenv("TTS_CACHE_MIN_USES") or 3)  # misses before an ad-hoc phrase is rendered
+IMAGE_BACKEND = (os.getenv("IMAGE_BACKEND") or "replicate").lower()  # replicate | local
+IMAGE_MODEL = os.getenv("IMAGE_MODEL") or "stability-ai/sdxl"
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR") or os.path.expanduser("~/.terminator_image_cache")
+IMAGE_MAX_CONCURRENT = int(os.getenv("IMAGE_MAX_CONCURRENT") or 2)
+IMAGE_QUEUE_SIZE = int(os.getenv("IMAGE_QUEUE_SIZE") or 8)  # running + queued jobs
+WIKI_CACHE_FILE = os.getenv("WIKI_CACHE_FILE") or os.path.expanduser("~/.terminator_wiki_cache.sqlite3")
+WIKI_CACHE_MAX_ENTRIES = int(os.getenv("WIKI_CACHE_MAX_ENTRIES") or 500)
+WIKI_CACHE_TTL = int(os.getenv("WIKI_CACHE_TTL") or 7 * 24 * 3600)  # seconds
+WIKI_FETCH_ASYNC = (os.getenv("WIKI_FETCH_ASYNC") or "1") != "0"  # look up uncached topics off the assistant loop
+SPEECH_BACKEND = (os.getenv("SPEECH_BACKEND") or "google").lower()  # google | vosk | transcript
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH") or os.path.expanduser("~/vosk-model-small-en-us")
+SPEECH_TRANSCRIPT_FILE = os.getenv("SPEECH_TRANSCRIPT_FILE")
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS") or 300)
+LOG_MAX_LINES = int(os.getenv("LOG_MAX_LINES") or 2000)
+LOG_TRIM_CHUNK = 200  # trim the log widget in chunks rather than line by line
+LOG_LEVELS = ("SYSTEM", "ERROR", "REMINDER", "You", "terminator")
+HEADLESS = False  # set by --headless/--replay: console log, text-only speech, commands from a file or stdin
+FS_WATCH = (os.getenv("FS_WATCH") or "auto").lower()  # auto | inotify | poll | off
+FS_POLL_INTERVAL = float(os.getenv("FS_POLL_INTERVAL") or 5.0)
+MONITOR_INTERVAL = float(os.getenv("MONITOR_INTERVAL") or 2.0)  # seconds between system samples
+MONITOR_HISTORY = int(os.getenv("MONITOR_HISTORY") or 3600)  # seconds of history kept in memory
+MONITOR_PROC_EVERY = 5  # scan processes every Nth sample; it is the expensive part
+MONITOR_TOP_N = 8
 SCREENSHOT_DIR = os.path.join(os.path.expanduser("~"), "Desktop")
 if not os.path.exists(SCREENSHOT_DIR):
     SCREENSHOT_DIR = os.path.expanduser("~")
@@ -107,17 +206,28 @@ if not os.path.exists(SCREENSHOT_DIR):
 # Global State and Memory
 # -------------------------
 user_data = {"name": "sir", "last_command_context": None}
-reminders_queue = queue.Queue()
 
 # -------------------------
 # NLP Initialization
 # -------------------------
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("SpaCy model 'en_core_web_sm' not found. Downloading...")
-    subprocess.run([sys.executable, "-m", "spacy", "download", "en_core_web_sm"])
-    nlp = spacy.load("en_core_web_sm")
+_nlp_model = None
+_nlp_lock = threading.Lock()
+
+def load_nlp():
+    """Load the spaCy model on first use, downloading it if missing."""
+    global _nlp_model
+    with _nlp_lock:
+        if _nlp_model is None:
+            try:
+                _nlp_model = spacy.load("en_core_web_sm")
+            except OSError:
+                print("SpaCy model 'en_core_web_sm' not found. Downloading...")
+                subprocess.run([sys.executable, "-m", "spacy", "download", "en_core_web_sm"])
+                _nlp_model = spacy.load("en_core_web_sm")
+    return _nlp_model
+
+def nlp(text):
+    return load_nlp()(text)
 
 # -------------------------
 # GUI
@@ -152,59 +262,565 @@ class terminatorGUI:
 
         self.status_label.pack(pady=6)
 
+        # Level filter; unchecking a level hides its lines without dropping them
+        filter_bar = tk.Frame(root, bg="#071226")
+        filter_bar.pack()
+        self._level_vars = {}
+        for level in LOG_LEVELS:
+            var = tk.BooleanVar(value=True)
+            tk.Checkbutton(filter_bar, text=level, variable=var, command=self._on_filter_change,
+                           fg="cyan", bg="#071226", selectcolor="#0b1a24", activebackground="#071226").pack(side=tk.LEFT, padx=4)
+            self._level_vars[level] = var
+        self._visible_levels = set(LOG_LEVELS)
+        self._history = collections.deque(maxlen=LOG_MAX_LINES)
+        self._widget_lines = 0
+
         self.log_area = scrolledtext.ScrolledText(root, wrap=tk.WORD, bg="#0b1a24", fg="#e6f1f5", font=("Consolas", 11), height=36, width=92)
 
         self.log_area.pack(padx=8, pady=8, fill=tk.BOTH, expand=True)
 
+        # Widgets are only touched on the Tk thread; other threads go through this queue.
+        self._ui_queue = queue.SimpleQueue()
+        self.root.after(self.UI_POLL_MS, self._pump)
+
+    UI_POLL_MS = 30
+
+    def post(self, fn, *args):
+        """Run fn(*args) on the Tk thread. Safe to call from any thread."""
+        self._ui_queue.put((fn, args))
+
     def update_status(self, text):
+        self._ui_queue.put((self._set_status, (text,)))
+
+    def log(self, message, sender="SYSTEM"):
+        t = datetime.datetime.now().strftime("%H:%M:%S")
+        self._ui_queue.put((None, (sender, f"[{t}] {sender}: {message}\n")))
+
+    def _set_status(self, text):
         try:
             self.status_label.config(text=f"Status: {text}")
-            self.root.update_idletasks()
         except Exception:
             pass
 
-    def log(self, message, sender="SYSTEM"):
+    def _shown(self, sender):
+        return sender in self._visible_levels or sender not in LOG_LEVELS
+
+    def _flush_lines(self, entries):
+        """Append a batch to the history ring and the widget, trimming the widget in chunks."""
+        self._history.extend(entries)
+        text = "".join(line for sender, line in entries if self._shown(sender))
+        entries.clear()
+        if not text:
+            return
+        try:
+            self.log_area.insert(tk.END, text)
+            self._widget_lines += text.count("\n")
+            if self._widget_lines > LOG_MAX_LINES + LOG_TRIM_CHUNK:
+                extra = self._widget_lines - LOG_MAX_LINES
+                self.log_area.delete("1.0", f"{extra + 1}.0")
+                self._widget_lines -= extra
+            self.log_area.see(tk.END)
+        except Exception:
+            print(text, end="")
+
+    def set_log_levels(self, levels):
+        """Show only the given senders and redraw the widget from the history ring."""
+        self._visible_levels = set(levels)
+        for level, var in self._level_vars.items():
+            var.set(level in self._visible_levels)
+        self._redraw()
+
+    def _on_filter_change(self):
+        self._visible_levels = {level for level, var in self._level_vars.items() if var.get()}
+        self._redraw()
+
+    def _redraw(self):
+        text = "".join(line for sender, line in self._history if self._shown(sender))
         try:
-            t = datetime.datetime.now().strftime("%H:%M:%S")
-            line = f"[{t}] {sender}: {message}\n"
-            self.log_area.insert(tk.END, line)
+            self.log_area.delete("1.0", tk.END)
+            self.log_area.insert(tk.END, text)
+            self._widget_lines = text.count("\n")
             self.log_area.see(tk.END)
-            self.root.update_idletasks()
         except Exception:
-            print(f"{sender}: {message}")
+            pass
+
+    def _pump(self):
+        """Drain everything queued since the last tick: one insert for all log lines, then the calls in order."""
+        lines = []  # (sender, line) pairs
+        while True:
+            try:
+                fn, payload = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if fn is None:
+                lines.append(payload)
+                continue
+            if lines:
+                self._flush_lines(lines)
+            try:
+                fn(*payload)
+            except Exception as e:
+                print(f"UI update error: {e}")
+        if lines:
+            self._flush_lines(lines)
+        self.root.after(self.UI_POLL_MS, self._pump)
+
+
+class ConsoleLog:
+    """Stands in for terminatorGUI when running headless: log lines go to stdout."""
+    def __init__(self, levels=LOG_LEVELS, stream=None):
+        self._visible_levels = set(levels)
+        self._stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def post(self, fn, *args):
+        fn(*args)
+
+    def update_status(self, text):
+        pass
+
+    def log(self, message, sender="SYSTEM"):
+        if sender not in self._visible_levels:
+            return
+        t = datetime.datetime.now().strftime("%H:%M:%S")
+        with self._lock:
+            print(f"[{t}] {sender}: {message}", file=self._stream, flush=True)
+
+    def set_log_levels(self, levels):
+        self._visible_levels = set(levels)
 
 # -------------------------
 # TTS
 # -------------------------
-engine = pyttsx3.init()
-engine.setProperty("rate", 170)
-engine.setProperty("volume", 1.0)
-_speaking_lock = threading.Lock()
+_engine = None
+
+def get_tts_engine():
+    global _engine
+    if _engine is None:
+        _engine = pyttsx3.init()
+        _engine.setProperty("rate", 170)
+        _engine.setProperty("volume", 1.0)
+    return _engine
+
+def split_sentences(text, max_len=200):
+    """Split text into sentences, breaking overly long ones at commas/semicolons."""
+    parts = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        while len(sentence) > max_len:
+            cut = max(sentence.rfind(", ", 0, max_len), sentence.rfind("; ", 0, max_len))
+            if cut <= 0:
+                break
+            parts.append(sentence[:cut + 1])
+            sentence = sentence[cut + 2:]
+        if sentence:
+            parts.append(sentence)
+    return parts
+
+class PhraseCache:
+    """
+    Pre-rendered audio for short, frequently spoken phrases, keyed by text and
+    voice settings. Rendered WAV files live on disk up to disk_bytes, evicted
+    least recently used first; the most recently used ones are also kept in
+    memory up to max_bytes. Fixed phrases are rendered on request(); other
+    phrases only once they have missed min_uses times. Rendering needs the TTS
+    engine, so misses are only queued here and rendered by the speech worker
+    when idle.
+    """
+    MAX_CHARS = 80
+    MAX_TRACKED = 1000  # ad-hoc phrases whose miss counts are remembered
+
+    def __init__(self, directory, max_bytes, disk_bytes=TTS_CACHE_DISK_BYTES, min_uses=TTS_CACHE_MIN_USES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.disk_bytes = disk_bytes
+        self.min_uses = min_uses
+        self._mem = collections.OrderedDict()
+        self._bytes = 0
+        self._disk = None  # key -> size, least recently used first; listed on first use
+        self._disk_total = 0
+        self._seen = collections.OrderedDict()  # key -> misses so far
+        self._backlog = collections.OrderedDict()
+        self._failed = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text, voice):
+        return hashlib.sha1(json.dumps([text, *voice]).encode("utf-8")).hexdigest()
+
+    def cacheable(self, text):
+        return len(text) <= self.MAX_CHARS
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".wav")
+
+    def _disk_index(self):
+        if self._disk is None:
+            entries = []
+            try:
+                with os.scandir(self.directory) as it:
+                    for entry in it:
+                        if entry.name.endswith(".wav"):
+                            st = entry.stat()
+                            entries.append((st.st_mtime, entry.name[:-4], st.st_size))
+            except OSError:
+                pass
+            entries.sort()
+            self._disk = collections.OrderedDict((key, size) for _, key, size in entries)
+            self._disk_total = sum(self._disk.values())
+        return self._disk
+
+    def _touch(self, key):
+        """Mark a file as recently used; the mtime keeps the order across restarts."""
+        disk = self._disk_index()
+        if key in disk:
+            disk.move_to_end(key)
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+
+    def _store(self, key, size):
+        disk = self._disk_index()
+        self._disk_total += size - disk.pop(key, 0)
+        disk[key] = size
+        while self._disk_total > self.disk_bytes and len(disk) > 1:
+            old, old_size = disk.popitem(last=False)
+            self._disk_total -= old_size
+            data = self._mem.pop(old, None)
+            if data is not None:
+                self._bytes -= len(data)
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    def _count_miss(self, key):
+        uses = self._seen.pop(key, 0) + 1
+        self._seen[key] = uses
+        if len(self._seen) > self.MAX_TRACKED:
+            self._seen.popitem(last=False)
+        return uses
 
-def speak(text):
-    with _speaking_lock:
+    def _put(self, key, data):
+        self._mem[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes and len(self._mem) > 1:
+            _, old = self._mem.popitem(last=False)
+            self._bytes -= len(old)
+
+    def get(self, text, voice):
+        """Return rendered audio bytes, or None (and queue a render) on a miss."""
+        key = self.key(text, voice)
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self._touch(key)
+                self.hits += 1
+                return data
+            if key in self._failed:
+                return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+        with self._lock:
+            if data:
+                self._put(key, data)
+                self._touch(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+            if self._count_miss(key) >= self.min_uses:
+                self._backlog[key] = (text, voice)
+        return None
+
+    def request(self, text, voice):
+        """Queue a fixed phrase for rendering regardless of how often it was used."""
+        key = self.key(text, voice)
+        with self._lock:
+            if key not in self._mem and key not in self._failed and not os.path.exists(self._path(key)):
+                self._backlog[key] = (text, voice)
+
+    def has_backlog(self):
+        return bool(self._backlog)
+
+    def render_next(self, engine, voice):
+        """Render one queued phrase with engine. Call only from the speech worker."""
+        with self._lock:
+            if not self._backlog:
+                return
+            key, (text, wanted_voice) = self._backlog.popitem(last=False)
+        if wanted_voice != voice:
+            return
+        path = self._path(key)
+        tmp = path + ".tmp"
         try:
-            gui.update_status("Speaking...")
+            os.makedirs(self.directory, exist_ok=True)
+            engine.save_to_file(text, tmp)
+            engine.runAndWait()
+            os.replace(tmp, path)
+            with open(path, "rb") as f:
+                data = f.read()
         except Exception:
-            pass
+            with self._lock:
+                self._failed.add(key)
+            return
+        with self._lock:
+            self._seen.pop(key, None)
+            self._put(key, data)
+            self._store(key, len(data))
+
+    def discard(self, text, voice):
+        """Forget a phrase whose audio could not be played."""
+        key = self.key(text, voice)
+        with self._lock:
+            data = self._mem.pop(key, None)
+            if data is not None:
+                self._bytes -= len(data)
+            self._failed.add(key)
+
+PREWARM_PHRASES = [
+    "Volume increased.", "Volume decreased.", "Muted.", "Unmuted.", "Paused.", "Resuming music.",
+    "Stopped music.", "Note saved.", "Window minimized.", "Window maximized.",
+]
+
+class SpeechQueue:
+    """
+    Owns the pyttsx3 engine on a dedicated worker thread. speak() enqueues an
+    utterance sentence by sentence and returns immediately; lower priority
+    numbers are spoken first. interrupt() drops everything queued so far and
+    tries to cut off the sentence in progress.
+    """
+    URGENT, HIGH, NORMAL = 0, 1, 5
+    TAIL_PAUSE = 0.35  # keep the mic from catching the end of our own speech
+
+    def __init__(self):
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._utterances = itertools.count(1)
+        self._generation = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._engine_ready = threading.Event()
+        self._engine = None
+        self._voice = None
+        self._speaking = False
+        self._cut = threading.Event()
+        self._thread = None
+        self.cache = PhraseCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES)
+        self.ttfa = collections.deque(maxlen=100)
+        self.spoken = 0
+        self.interrupted = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tts", daemon=True)
+                self._thread.start()
+
+    def wait_engine(self, timeout=None):
+        """Wait for the worker to initialise the engine. Returns False if it failed."""
+        self.start()
+        return self._engine_ready.wait(timeout) and self._engine is not None
+
+    def say(self, text, priority=NORMAL):
+        sentences = split_sentences(text)
+        if not sentences:
+            return None
+        self.start()
+        with self._lock:
+            uid = next(self._utterances)
+            enqueued = time.perf_counter()
+            self._pending += len(sentences)
+            self._idle.clear()
+            for i, sentence in enumerate(sentences):
+                self._queue.put((priority, next(self._seq), self._generation, i == 0, enqueued, sentence))
+        return uid
+
+    def interrupt(self):
+        """Barge-in: drop queued sentences and stop the current one."""
+        with self._lock:
+            self._generation += 1
+            speaking = self._speaking
+        if speaking:
+            self.interrupted += 1
+            self._cut.set()
+            try:
+                self._engine.stop()
+            except Exception:
+                pass
+
+    def depth(self):
+        return self._pending
+
+    def is_busy(self):
+        return not self._idle.is_set()
+
+    def wait_idle(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def stats(self):
+        ttfa = list(self.ttfa)
+        return {
+            "queue_depth": self._pending,
+            "spoken": self.spoken,
+            "interrupted": self.interrupted,
+            "ttfa_last": ttfa[-1] if ttfa else None,
+            "ttfa_avg": sum(ttfa) / len(ttfa) if ttfa else None,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
+
+    def prewarm(self, phrases):
+        """Queue phrases for rendering into the phrase cache while the worker is idle."""
+        if not self.wait_engine(timeout=30):
+            return False
+        for phrase in phrases:
+            self.cache.request(phrase, self._voice)
+        self._queue.put((self.NORMAL + 1, next(self._seq), -1, False, 0.0, None))
+
+    def _play_cached(self, data):
+        """Play pre-rendered audio through the pygame mixer. Returns False if it can't."""
+        if not init_mixer():
+            return False
         try:
-            gui.log(text, "terminator")
+            sound = pygame.mixer.Sound(file=io.BytesIO(data))
+            self._cut.clear()
+            channel = sound.play()
         except Exception:
-            pass
+            return False
+        if self._cut.wait(sound.get_length()):
+            channel.stop()
+        return True
+
+    def _speak_sentence(self, sentence):
+        if self.cache.cacheable(sentence):
+            data = self.cache.get(sentence, self._voice)
+            if data is not None:
+                if self._play_cached(data):
+                    return
+                self.cache.discard(sentence, self._voice)
+        self._engine.say(sentence)
+        self._engine.runAndWait()
+
+    def _run(self):
         try:
-            engine.say(text)
-            engine.runAndWait()
+            self._engine = get_tts_engine()
+            self._voice = tuple(self._engine.getProperty(p) for p in ("voice", "rate", "volume"))
         except Exception as e:
-            try:
-                gui.log(f"TTS error: {e}", "ERROR")
-            except Exception:
-                print("TTS error:", e)
+            _log_tts_error(e)
         finally:
-            time.sleep(0.35)
-            try:
-                gui.update_status("Idle")
-            except Exception:
-                pass
+            self._engine_ready.set()
+        while True:
+            if self.cache.has_backlog() and self._engine is not None:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    self.cache.render_next(self._engine, self._voice)
+                    continue
+            else:
+                item = self._queue.get()
+            _, _, generation, first, enqueued, sentence = item
+            if sentence is None:
+                continue  # wake-up marker from prewarm()
+            with self._lock:
+                stale = generation != self._generation
+                self._speaking = not stale and self._engine is not None
+            if self._speaking:
+                if first:
+                    self.ttfa.append(time.perf_counter() - enqueued)
+                try:
+                    gui.update_status("Speaking...")
+                except Exception:
+                    pass
+                try:
+                    self._speak_sentence(sentence)
+                    self.spoken += 1
+                except Exception as e:
+                    _log_tts_error(e)
+            with self._lock:
+                self._speaking = False
+                self._pending -= 1
+                drained = self._pending == 0
+            if drained:
+                time.sleep(self.TAIL_PAUSE)
+                with self._lock:
+                    if self._pending == 0:
+                        self._idle.set()
+                try:
+                    gui.update_status("Idle")
+                except Exception:
+                    pass
+
+def _log_tts_error(e):
+    try:
+        gui.log(f"TTS error: {e}", "ERROR")
+    except Exception:
+        print("TTS error:", e)
+
+speech = SpeechQueue()
+
+class TextSpeech:
+    """Stands in for SpeechQueue when running headless: utterances are kept as text instead of spoken."""
+    URGENT, HIGH, NORMAL = SpeechQueue.URGENT, SpeechQueue.HIGH, SpeechQueue.NORMAL
+
+    def __init__(self):
+        self.transcript = []
+        self.spoken = 0
+        self.interrupted = 0
+        self._lock = threading.Lock()
+
+    def say(self, text, priority=NORMAL):
+        with self._lock:
+            self.transcript.append(text)
+            self.spoken += 1
+
+    def take(self):
+        """Everything said since the last take()."""
+        with self._lock:
+            said, self.transcript = self.transcript, []
+        return said
+
+    def interrupt(self):
+        self.interrupted += 1
+
+    def start(self):
+        pass
+
+    def wait_engine(self, timeout=None):
+        return False
+
+    def wait_idle(self, timeout=None):
+        return True
+
+    def is_busy(self):
+        return False
+
+    def depth(self):
+        return 0
+
+    def prewarm(self, phrases):
+        return False
+
+    def stats(self):
+        return {"queue_depth": 0, "spoken": self.spoken, "interrupted": self.interrupted,
+                "ttfa_last": None, "ttfa_avg": None, "cache_hits": 0, "cache_misses": 0}
+
+def speak(text, priority=SpeechQueue.NORMAL, wait=False):
+    """Queue text for the TTS worker. Pass wait=True to block until it has been spoken."""
+    try:
+        gui.log(text, "terminator")
+    except Exception:
+        pass
+    speech.say(text, priority)
+    if wait:
+        speech.wait_idle()
 
 # -------------------------
 # App scanning & opening
@@ -214,13 +830,196 @@ installed_apps = {}
 def normalize_name(name: str) -> str:
     return "".join(ch.lower() if ch.isalnum() else " " for ch in name).strip()
 
-def scan_installed_apps():
-    installed_apps.clear()
+class FuzzyIndex:
+    """
+    Name -> value lookup shared by app and music matching.
+    Keeps an inverted token index, a sorted token table for prefix lookups and a
+    trigram index, so a query only touches entries that share something with it.
+    Ranking: exact > prefix > token overlap > trigram similarity. Only the
+    first three are confident enough to act on (score >= MIN_ACT_SCORE);
+    trigram-only hits are offered through suggest() instead.
+    """
+    COMMON_POSTINGS = 2000  # postings larger than this only re-score existing candidates
+    PREFIX_LIMIT = 50
+    MIN_SIMILARITY = 0.3
+    MIN_ACT_SCORE = 40.0  # token overlap scores from 40; trigram similarity tops out at 35
+
+    def __init__(self, entries=None):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._tokens = {}
+        self._grams = {}
+        self._gram_counts = {}
+        self._sorted_names = []
+        self._sorted_tokens = []
+        if entries:
+            self.rebuild(entries)
+
+    @staticmethod
+    def _key(name):
+        return " ".join(normalize_name(name).split())
+
+    @staticmethod
+    def _trigrams(key):
+        padded = f" {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, name):
+        return self._key(name) in self._values
+
+    def _index(self, key, tokens, grams, gram_counts):
+        for tok in set(key.split()):
+            tokens.setdefault(tok, set()).add(key)
+        g = self._trigrams(key)
+        gram_counts[key] = len(g)
+        for gram in g:
+            grams.setdefault(gram, set()).add(key)
+
+    def rebuild(self, entries):
+        """Replace the whole index. Built off-lock and swapped in, so queries never block on a rescan."""
+        values, tokens, grams, gram_counts = {}, {}, {}, {}
+        for name, value in entries.items():
+            key = self._key(name)
+            if not key or key in values:
+                continue
+            values[key] = value
+            self._index(key, tokens, grams, gram_counts)
+        with self._lock:
+            self._values, self._tokens, self._grams, self._gram_counts = values, tokens, grams, gram_counts
+            self._sorted_names = sorted(values)
+            self._sorted_tokens = sorted(tokens)
+
+    def add(self, name, value):
+        key = self._key(name)
+        if not key:
+            return
+        with self._lock:
+            if key in self._values:
+                self._values[key] = value
+                return
+            self._values[key] = value
+            for tok in set(key.split()):
+                if tok not in self._tokens:
+                    bisect.insort(self._sorted_tokens, tok)
+            self._index(key, self._tokens, self._grams, self._gram_counts)
+            bisect.insort(self._sorted_names, key)
+
+    def remove(self, name):
+        key = self._key(name)
+        with self._lock:
+            if self._values.pop(key, None) is None:
+                return
+            for tok in set(key.split()):
+                postings = self._tokens.get(tok)
+                postings.discard(key)
+                if not postings:
+                    del self._tokens[tok]
+                    i = bisect.bisect_left(self._sorted_tokens, tok)
+                    del self._sorted_tokens[i]
+            for gram in self._trigrams(key):
+                postings = self._grams.get(gram)
+                postings.discard(key)
+                if not postings:
+                    del self._grams[gram]
+            del self._gram_counts[key]
+            del self._sorted_names[bisect.bisect_left(self._sorted_names, key)]
+
+    def clear(self):
+        self.rebuild({})
+
+    @staticmethod
+    def _accumulate(counter, postings, weight, limit):
+        if len(postings) > limit and counter:
+            for name in counter:
+                if name in postings:
+                    counter[name] += weight
+        else:
+            for name in postings:
+                counter[name] += weight
+
+    def top_k(self, query, k=5):
+        """Return up to k (score, name, value) tuples, best first."""
+        q = self._key(query)
+        if not q:
+            return []
+        with self._lock:
+            scores = {}
+            if q in self._values:
+                scores[q] = 100.0
+
+            names = self._sorted_names
+            i = bisect.bisect_left(names, q)
+            for name in names[i:i + self.PREFIX_LIMIT]:
+                if not name.startswith(q):
+                    break
+                if name != q:
+                    scores[name] = 80.0 + 10.0 * len(q) / len(name)
+
+            q_tokens = sorted(set(q.split()), key=lambda t: len(self._tokens.get(t, ())))
+            overlap = collections.Counter()
+            for tok in q_tokens:
+                postings = self._tokens.get(tok)
+                if postings:
+                    self._accumulate(overlap, postings, 1.0, self.COMMON_POSTINGS)
+                    continue
+                j = bisect.bisect_left(self._sorted_tokens, tok)
+                for t in self._sorted_tokens[j:j + self.PREFIX_LIMIT]:
+                    if not t.startswith(tok):
+                        break
+                    self._accumulate(overlap, self._tokens[t], 0.8, self.COMMON_POSTINGS)
+            for name, hits in overlap.items():
+                hits = min(hits, len(q_tokens))
+                n_tokens = len(set(name.split()))
+                score = 40.0 + 20.0 * hits / len(q_tokens) + 10.0 * min(hits, n_tokens) / n_tokens
+                if score > scores.get(name, 0.0):
+                    scores[name] = score
+
+            if not scores:
+                q_grams = sorted(self._trigrams(q), key=lambda g: len(self._grams.get(g, ())))
+                shared = collections.Counter()
+                for gram in q_grams:
+                    postings = self._grams.get(gram)
+                    if postings:
+                        self._accumulate(shared, postings, 1, self.COMMON_POSTINGS)
+                for name, n in shared.items():
+                    similarity = n / (len(q_grams) + self._gram_counts[name] - n)
+                    if similarity >= self.MIN_SIMILARITY:
+                        scores[name] = 35.0 * similarity
+
+            ranked = heapq.nsmallest(k, scores.items(), key=lambda kv: (-kv[1], len(kv[0]), kv[0]))
+            return [(score, name, self._values[name]) for name, score in ranked]
+
+    def best(self, query):
+        """Value of the best exact, prefix or token match, or None."""
+        hits = self.top_k(query, 1)
+        return hits[0][2] if hits and hits[0][0] >= self.MIN_ACT_SCORE else None
+
+    def suggest(self, query):
+        """(name, value) of the closest entry when nothing matched well enough to act on, else None."""
+        hits = self.top_k(query, 1)
+        return (hits[0][1], hits[0][2]) if hits and hits[0][0] < self.MIN_ACT_SCORE else None
+
+app_matcher = FuzzyIndex()
+
+_app_snapshot = {}  # directory -> {"mtime", "apps", "subdirs"} from the last walk
+_app_scan_lock = threading.Lock()  # guards installed_apps, app_matcher and _app_snapshot
+
+def _log_system(message):
     try:
-        gui.log("Scanning installed apps...", "SYSTEM")
+        gui.log(message, "SYSTEM")
     except NameError:
-        print("Scanning installed apps...")
-        
+        print(message)
+
+def headless_skip(action):
+    """In headless mode, log an action that would touch the desktop, browser or network instead of doing it."""
+    if HEADLESS:
+        gui.log(f"Skipped {action} (headless mode).", "SYSTEM")
+    return HEADLESS
+
+def _app_scan_roots():
     paths = []
     progdata = os.environ.get("PROGRAMDATA")
     appdata = os.environ.get("APPDATA")
@@ -239,44 +1038,125 @@ def scan_installed_apps():
         os.path.expanduser(r"~\\AppData\\Local\\Microsoft\\WindowsApps")
     ]
     paths.extend([p for p in special if p and os.path.exists(p)])
-    visited = set()
-    for base in paths:
-        if not base or not os.path.exists(base):
+    return paths
+
+def _walk_app_dirs(base, old_dirs, new_dirs):
+    """
+    Walk one root, re-listing only directories whose mtime changed since the last
+    snapshot. Unchanged directories reuse their recorded files and subdirectories,
+    so an untouched tree costs one stat per directory. Returns the number re-listed.
+    """
+    relisted = 0
+    stack = [base]
+    while stack:
+        d = stack.pop()
+        if d in new_dirs:
+            continue
+        try:
+            mtime = os.stat(d).st_mtime
+        except OSError:
             continue
-        for root_dir, dirs, files in os.walk(base):
-            for file in files:
-                if file.lower().endswith((".lnk", ".exe")):
-                    full = os.path.join(root_dir, file)
-                    key = normalize_name(os.path.splitext(file)[0])
-                    if key not in visited:
-                        installed_apps[key] = full
-                        visited.add(key)
+        rec = old_dirs.get(d)
+        if rec is None or rec["mtime"] != mtime:
+            apps, subdirs = [], []
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith((".lnk", ".exe")):
+                            apps.append(entry.name)
+            except OSError:
+                continue
+            rec = {"mtime": mtime, "apps": apps, "subdirs": subdirs}
+            relisted += 1
+        new_dirs[d] = rec
+        stack.extend(reversed(rec["subdirs"]))
+    return relisted
+
+def _apply_app_snapshot(dirs):
+    apps = {}
+    for d, rec in dirs.items():
+        for file in rec["apps"]:
+            key = normalize_name(os.path.splitext(file)[0])
+            if key not in apps:
+                apps[key] = os.path.join(d, file)
+    installed_apps.clear()
+    installed_apps.update(apps)
+    app_matcher.rebuild(apps)
+
+def save_app_cache():
     try:
-        gui.log(f"App scan complete. Found {len(installed_apps)} apps.", "SYSTEM")
-    except NameError:
-        print(f"App scan complete. Found {len(installed_apps)} apps.")
+        tmp = APP_CACHE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "dirs": _app_snapshot}, f)
+        os.replace(tmp, APP_CACHE_FILE)
+    except Exception as e:
+        _log_system(f"Could not save app cache: {e}")
+
+def load_app_cache() -> bool:
+    """Populate installed_apps from the on-disk snapshot. Returns False if there is none."""
+    global _app_snapshot
+    try:
+        with open(APP_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != 1:
+            return False
+        dirs = data["dirs"]
+    except (OSError, ValueError, KeyError):
+        return False
+    with _app_scan_lock:
+        _app_snapshot = dirs
+        _apply_app_snapshot(dirs)
+    _log_system(f"Loaded {len(installed_apps)} apps from cache.")
+    return True
+
+def invalidate_app_cache():
+    global _app_snapshot
+    with _app_scan_lock:
+        _app_snapshot = {}
+    try:
+        os.remove(APP_CACHE_FILE)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        _log_system(f"Could not remove app cache: {e}")
+
+def scan_installed_apps(full=False):
+    """Refresh installed_apps, re-walking only changed directories unless full is set."""
+    global _app_snapshot
+    with _app_scan_lock:
+        _log_system("Scanning installed apps...")
+        old_dirs = {} if full else _app_snapshot
+        new_dirs = {}
+        relisted = 0
+        for base in _app_scan_roots():
+            if not base or not os.path.exists(base):
+                continue
+            relisted += _walk_app_dirs(base, old_dirs, new_dirs)
+        changed = relisted or len(new_dirs) != len(old_dirs)
+        _app_snapshot = new_dirs
+        _apply_app_snapshot(new_dirs)
+        if changed:
+            save_app_cache()
+    _log_system(f"App scan complete. Found {len(installed_apps)} apps ({relisted} of {len(new_dirs)} folders re-read).")
+    if not installed_apps:
+        _log_system("App scan found no applications; check the Start Menu and Program Files locations.")
+
+def rescan_apps_async(full=True):
+    threading.Thread(target=scan_installed_apps, args=(full,), daemon=True).start()
 
 def find_best_app_match(query: str):
-    q = normalize_name(query)
-    if not q:
-        return None
-    for name, path in installed_apps.items():
-        if q == name or q in name or name in q:
-            return path
-    q_tokens = set(q.split())
-    best = (None, 0)
-    for name, path in installed_apps.items():
-        name_tokens = set(name.split())
-        score = len(q_tokens & name_tokens)
-        if score > best[1]:
-            best = (path, score)
-    if best[1] > 0:
-        return best[0]
-    return None
+    return app_matcher.best(query)
 
 def open_application_by_name(app_query: str) -> bool:
+    if not startup.wait("apps", timeout=0.5) and not installed_apps:
+        gui.log("App index is still loading.", "SYSTEM")
+        return False
     path = find_best_app_match(app_query)
     if path:
+        if headless_skip(f"opening {path}"):
+            return True
         try:
             gui.log(f"Opening: {path}", "SYSTEM")
             try:
@@ -290,213 +1170,1596 @@ def open_application_by_name(app_query: str) -> bool:
             return False
     return False
 
-def close_application_by_name(app_query: str) -> bool:
+class ProcessIndex:
+    """
+    Running processes by name. refresh() diffs the current PID set against the
+    last one and only looks up names for new PIDs, so keeping the index current
+    costs one PID listing. Names go into a FuzzyIndex for ranked matching, each
+    mapping to the set of PIDs running under it.
+    """
+    MIN_SCORE = 80.0  # exact or prefix; never terminate on a loose similarity hit
+
+    def __init__(self, min_interval=0.5):
+        self.min_interval = min_interval
+        self.matcher = FuzzyIndex()
+        self._pids = {}  # pid -> (key, create_time)
+        self._by_name = {}  # key -> set of pids
+        self._lock = threading.Lock()
+        self._refreshed = 0.0
+        self.stats = {"refreshes": 0, "added": 0, "removed": 0, "refresh_time": 0.0}
+
+    @staticmethod
+    def _name_key(name):
+        return name[:-4] if name.lower().endswith(".exe") else name
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and time.time() - self._refreshed < self.min_interval:
+                return
+            t0 = time.perf_counter()
+            current = set(psutil.pids())
+            known = self._pids.keys()
+            for pid in known - current:
+                self._forget(pid)
+            for pid in current - known:
+                try:
+                    proc = psutil.Process(pid)
+                    key = self._name_key(proc.name())
+                    created = proc.create_time()
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    continue
+                if not normalize_name(key):
+                    continue
+                self._pids[pid] = (key, created)
+                pids = self._by_name.setdefault(key, set())
+                if not pids:
+                    self.matcher.add(key, key)
+                pids.add(pid)
+                self.stats["added"] += 1
+            self._refreshed = time.time()
+            self.stats["refreshes"] += 1
+            self.stats["refresh_time"] += time.perf_counter() - t0
+
+    def _forget(self, pid):
+        key, _ = self._pids.pop(pid)
+        pids = self._by_name.get(key)
+        pids.discard(pid)
+        if not pids:
+            del self._by_name[key]
+            self.matcher.remove(key)
+        self.stats["removed"] += 1
+
+    def find(self, query, all_matches=False):
+        """
+        Ranked (name, [psutil.Process]) groups for a query. Without all_matches
+        only the best name is returned; with it, every exact or prefix match.
+        Names scoring below MIN_SCORE are never returned.
+        """
+        self.refresh()
+        hits = self.matcher.top_k(query, k=20 if all_matches else 1)
+        hits = [h for h in hits if h[0] >= self.MIN_SCORE]
+        groups = []
+        own = os.getpid()
+        with self._lock:
+            for _, _, key in hits:
+                procs = []
+                for pid in sorted(self._by_name.get(key, ())):
+                    if pid == own:
+                        continue
+                    try:
+                        proc = psutil.Process(pid)
+                        if proc.create_time() == self._pids[pid][1]:  # not a recycled PID
+                            procs.append(proc)
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, KeyError):
+                        continue
+                if procs:
+                    groups.append((key, procs))
+        return groups
+
+    def __len__(self):
+        return len(self._pids)
+
+process_index = ProcessIndex()
+
+def terminate_processes(procs, timeout=3.0):
+    """terminate(), wait up to timeout, then kill() what is left. Returns (closed, failed)."""
+    closed, failed = [], []
+    asked = []
+    for proc in procs:
+        try:
+            proc.terminate()
+            asked.append(proc)
+        except psutil.NoSuchProcess:
+            closed.append(proc)
+        except psutil.AccessDenied:
+            failed.append(proc)
+    gone, alive = psutil.wait_procs(asked, timeout=timeout)
+    closed.extend(gone)
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.AccessDenied:
+            failed.append(proc)
+    if alive:
+        gone, still = psutil.wait_procs([p for p in alive if p not in failed], timeout=1.0)
+        closed.extend(gone)
+        failed.extend(still)
+    return closed, failed
+
+def close_application_by_name(app_query: str, close_all=False) -> int:
     """
-    Finds and closes a process by its name using taskkill on Windows.
-    This works better than a keyboard shortcut.
+    Close every process of the best-matching running application (or of every
+    exact/prefix match with close_all) via psutil. Returns how many exited.
     """
-    normalized_query = normalize_name(app_query)
-    found_match = False
     try:
-        if psutil is None:
+        if not psutil:
             gui.log("psutil is not installed. Cannot close application by name.", "ERROR")
-            return False
-        for proc in psutil.process_iter(['name']):
-            if normalized_query in normalize_name(proc.info['name']):
-                gui.log(f"Found process to kill: {proc.info['name']}", "SYSTEM")
-                subprocess.run(['taskkill', '/f', '/im', proc.info['name']], check=True)
-                gui.log(f"Closed {proc.info['name']}", "SYSTEM")
-                found_match = True
-                break
-        if not found_match:
-            gui.log(f"No running process found for '{app_query}'", "SYSTEM")
-            return False
-        return True
+            return 0
+        groups = process_index.find(app_query, all_matches=close_all)
+        if not groups:
+            gui.log(f"No running app matches '{app_query}'", "SYSTEM")
+            return 0
+        procs = [proc for _, group in groups for proc in group]
+        if headless_skip(f"closing {len(procs)} process(es): {', '.join(name for name, _ in groups)}"):
+            return len(procs)
+        gui.log(f"Closing {len(procs)} process(es): {', '.join(name for name, _ in groups)}", "SYSTEM")
+        closed, failed = terminate_processes(procs)
+        if failed:
+            gui.log(f"Could not close {len(failed)} process(es) (access denied or still running).", "ERROR")
+        process_index.refresh(force=True)
+        return len(closed)
     except Exception as e:
         gui.log(f"Failed to close application: {e}", "ERROR")
-        return False
-        
+        return 0
+
 # -------------------------
 # Local music with pygame
 # -------------------------
-if pygame:
-    try:
-        pygame.mixer.init()
-    except Exception:
-        pass
-else:
-    print("Pygame is not installed. Local music playback will be unavailable.")
-
-current_music_path = None
-music_paused = False
-local_music_index = {}
-
-def index_local_music(root_dir=MUSIC_DIR):
-    music_index = {}
-    if not os.path.exists(root_dir):
-        gui.log(f"Music folder not found: {root_dir}", "SYSTEM")
-        return music_index
-    for root_dir, _, files in os.walk(root_dir):
-        for f in files:
-            if f.lower().endswith(AUDIO_EXTS):
-                key = normalize_name(os.path.splitext(f)[0])
-                if key not in music_index:
-                    music_index[key] = os.path.join(root_dir, f)
-    gui.log(f"Indexed {len(music_index)} local tracks.", "SYSTEM")
-    return music_index
+_mixer_ready = False
 
-def find_local_track(query: str):
-    q = normalize_name(query)
-    if not q:
-        return None
-    for name, path in local_music_index.items():
-        if q == name or q in name or name in q:
-            return path
-    q_tokens = set(q.split())
-    best = (None, 0)
-    for name, path in local_music_index.items():
-        name_tokens = set(name.split())
-        score = len(q_tokens & name_tokens)
-        if score > best[1]:
-            best = (path, score)
-    if best[1] > 0:
-        return best[0]
-    return None
-
-def play_local_music(path: str):
-    if pygame is None:
-        speak("Pygame is not installed. I cannot play local music.")
+def init_mixer():
+    """Initialise the pygame mixer on first playback. Returns False if pygame is missing."""
+    global _mixer_ready
+    if not pygame:
         return False
-    global current_music_path, music_paused
-    try:
-        pygame.mixer.music.stop()
-        pygame.mixer.music.unload()
-    except Exception:
-        pass
-    try:
-        pygame.mixer.music.load(path)
-        pygame.mixer.music.play()
-        current_music_path = path
-        music_paused = False
-        gui.log(f"Playing local track: {path}", "SYSTEM")
-        speak(f"Playing {os.path.basename(path)} from local music.")
+    if not _mixer_ready:
+        try:
+            pygame.mixer.init()
+        except Exception:
+            pass
+        _mixer_ready = True
+    return True
+
+def read_track_tags(path):
+    """(path, title, artist, album, duration) from the file's tags; runs in the scan process pool."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    title, artist, album, duration = stem, "", "", None
+    if mutagen:
+        try:
+            audio = mutagen.File(path, easy=True)
+            if audio is not None:
+                tags = audio.tags or {}
+                first = lambda k: (tags.get(k) or [""])[0].strip()
+                title = first("title") or stem
+                artist = first("artist") or first("albumartist")
+                album = first("album")
+                duration = getattr(audio.info, "length", None)
+        except Exception:
+            pass
+    return path, title, artist, album, duration
+
+class MusicLibrary:
+    """
+    Local tracks with tags, persisted in SQLite. load() rebuilds the in-memory
+    matchers from the database without touching the music folder; scan() walks
+    it and only re-reads tags for files whose mtime or size changed, using a
+    process pool for large batches. Tracks are matched on "title artist album"
+    and separately by artist.
+    """
+    POOL_THRESHOLD = 64  # fewer changed files than this are tagged in-process
+
+    def __init__(self, db_path, root):
+        self.db_path = db_path
+        self.root = root
+        self.tracks = {}  # path -> (title, artist, album, duration)
+        self.matcher = FuzzyIndex()
+        self.artists = FuzzyIndex()
+        self._keys = {}  # path -> matcher key
+        self._by_artist = {}  # artist key -> set of paths
+        self._conn = None
+        self._lock = threading.RLock()
+        self.stats = {}
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS tracks (
+                path TEXT PRIMARY KEY, mtime REAL NOT NULL, size INTEGER NOT NULL,
+                title TEXT NOT NULL, artist TEXT NOT NULL, album TEXT NOT NULL, duration REAL)""")
+        return self._conn
+
+    def _index(self, path, title, artist, album, duration):
+        self._unindex(path)
+        self.tracks[path] = (title, artist, album, duration)
+        key = " ".join(part for part in (title, artist, album) if part)
+        if key in self.matcher and self.matcher.best(key) != path:
+            key = f"{key} {os.path.splitext(os.path.basename(path))[0]}"  # same tags, different file
+        self._keys[path] = key
+        self.matcher.add(key, path)
+        if artist:
+            artist_key = normalize_name(artist)
+            paths = self._by_artist.setdefault(artist_key, set())
+            if not paths:
+                self.artists.add(artist, artist_key)
+            paths.add(path)
+
+    def _unindex(self, path):
+        track = self.tracks.pop(path, None)
+        if track is None:
+            return
+        self.matcher.remove(self._keys.pop(path))
+        if track[1]:
+            artist_key = normalize_name(track[1])
+            paths = self._by_artist.get(artist_key, set())
+            paths.discard(path)
+            if not paths:
+                self._by_artist.pop(artist_key, None)
+                self.artists.remove(track[1])
+
+    def load(self):
+        """Warm start: index every track known to the database."""
+        t0 = time.perf_counter()
+        with self._lock:
+            rows = self._db().execute("SELECT path, title, artist, album, duration FROM tracks").fetchall()
+            for row in rows:
+                self._index(*row)
+        self.stats["load_time"] = time.perf_counter() - t0
+        _log_system(f"Loaded {len(rows)} local tracks from the music library.")
+
+    def _tag(self, paths):
+        if len(paths) < self.POOL_THRESHOLD:
+            return [read_track_tags(p) for p in paths]
+        workers = os.cpu_count() or 1
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(read_track_tags, paths, chunksize=max(1, min(256, len(paths) // (workers * 4)))))
+
+    def scan(self):
+        """Bring the library in line with the music folder; returns (added_or_changed, removed)."""
+        if not os.path.exists(self.root):
+            _log_system(f"Music folder not found: {self.root}")
+            return 0, 0
+        t0 = time.perf_counter()
+        on_disk = {}
+        for dirpath, _, files in os.walk(self.root):
+            for f in files:
+                if f.lower().endswith(AUDIO_EXTS):
+                    path = os.path.join(dirpath, f)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    on_disk[path] = (st.st_mtime, st.st_size)
+        with self._lock:
+            known = {path: (mtime, size) for path, mtime, size in
+                     self._db().execute("SELECT path, mtime, size FROM tracks")}
+        changed = [path for path, stamp in on_disk.items() if known.get(path) != stamp]
+        removed = [path for path in known if path not in on_disk]
+        walked = time.perf_counter()
+        tagged = self._tag(changed) if changed else []
+        self.apply(tagged, removed, {p: on_disk[p] for p in changed})
+        self.stats.update(scan_time=time.perf_counter() - t0, walk_time=walked - t0,
+                          tagged=len(tagged), removed=len(removed))
+        _log_system(f"Music library: {len(self.tracks)} tracks ({len(tagged)} updated, {len(removed)} removed).")
+        return len(tagged), len(removed)
+
+    def apply(self, tagged, removed, stamps=None):
+        """Store freshly tagged tracks and drop removed paths, in the database and the matchers."""
+        stamps = stamps or {}
+        rows = []
+        for path, title, artist, album, duration in tagged:
+            mtime, size = stamps.get(path) or (os.path.getmtime(path), os.path.getsize(path))
+            rows.append((path, mtime, size, title, artist, album, duration))
+        with self._lock:
+            db = self._db()
+            with db:
+                db.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                db.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in removed])
+            for path in removed:
+                self._unindex(path)
+            for path, title, artist, album, duration in tagged:
+                self._index(path, title, artist, album, duration)
+
+    def update_paths(self, added, removed):
+        """Apply a batch of filesystem changes: re-tag added/modified files, drop removed ones."""
+        stamps = {}
+        for path in added:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamps[path] = (st.st_mtime, st.st_size)
+        self.apply(self._tag(list(stamps)) if stamps else [], removed, stamps)
+
+    def find(self, query):
+        return self.matcher.best(query)
+
+    def by_artist(self, query):
+        """(artist name, [paths]) for the best-matching artist, or (None, [])."""
+        hits = self.artists.top_k(query, 1)
+        if not hits or hits[0][0] < self.artists.MIN_ACT_SCORE:
+            return None, []
+        _, name, artist_key = hits[0]
+        with self._lock:
+            paths = sorted(self._by_artist.get(artist_key, ()))
+        return (self.tracks[paths[0]][1] if paths else name), paths
+
+    def describe(self, path):
+        track = self.tracks.get(path)
+        if not track:
+            return os.path.basename(path)
+        title, artist = track[0], track[1]
+        return f"{title} by {artist}" if artist else title
+
+    def __len__(self):
+        return len(self.tracks)
+
+library = MusicLibrary(MUSIC_DB, MUSIC_DIR)
+music_matcher = library.matcher
+
+def find_local_track(query: str):
+    return library.find(query)
+
+class PlaybackEngine:
+    """
+    Play queue on top of pygame.mixer.music. The upcoming track is read into
+    memory by a background thread and handed to pygame.mixer.music.queue(), so
+    the mixer starts it the moment the current track ends, with no gap. A
+    watcher thread only notices that hand-over (get_pos() starts again from
+    zero) to move the index along and queue the track after it. Every requested
+    switch is timed from the request until playback has started.
+    """
+    PRELOAD_MAX_BYTES = 64 * 1024 * 1024  # larger files are opened from disk
+
+    def __init__(self, poll=0.05):
+        self.poll = poll
+        self.queue = []
+        self.index = -1
+        self.paused = False
+        self.playing = False
+        self._preloaded = {}  # path -> bytes, for the next track only
+        self._queued = None  # path handed to the mixer to follow the current track
+        self._last_pos = 0
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._watcher = None
+        self.stats = {"switches": 0, "switch_total": 0.0, "switch_max": 0.0, "switch_last": None,
+                      "auto_advances": 0, "gapless": 0, "preload_hits": 0, "preload_misses": 0}
+
+    @property
+    def current(self):
+        with self._lock:
+            return self.queue[self.index] if 0 <= self.index < len(self.queue) else None
+
+    def _open(self, path):
+        data = self._preloaded.pop(path, None)
+        if data is None:
+            self.stats["preload_misses"] += 1
+            return path
+        self.stats["preload_hits"] += 1
+        return io.BytesIO(data)
+
+    def _start(self, index, since):
+        """Play queue[index]; since is when the switch was asked for (perf_counter)."""
+        path = self.queue[index]
+        source = self._open(path)
+        self._queued, self._last_pos = None, 0  # loading drops whatever the mixer had queued
+        try:
+            pygame.mixer.music.unload()
+        except Exception:
+            pass
+        if isinstance(source, io.BytesIO):
+            pygame.mixer.music.load(source, os.path.basename(path))  # the name hints the decoder
+        else:
+            pygame.mixer.music.load(source)
+        pygame.mixer.music.play()
+        self.index, self.playing, self.paused = index, True, False
+        latency = time.perf_counter() - since
+        st = self.stats
+        st["switches"] += 1
+        st["switch_total"] += latency
+        st["switch_last"] = latency
+        st["switch_max"] = max(st["switch_max"], latency)
+        self._preload_next()
+        self._ensure_watcher()
+        return path
+
+    def _queue(self, path, data):
+        """Hand the next track to the mixer so it follows the current one without a gap."""
+        try:
+            if data is None:
+                pygame.mixer.music.queue(path)
+            else:
+                pygame.mixer.music.queue(io.BytesIO(data), os.path.basename(path))
+        except Exception:
+            return  # the watcher starts it itself when the current track ends
+        self._queued = path
+
+    def _preload_next(self):
+        nxt = self.index + 1
+        if nxt >= len(self.queue):
+            return
+        path = self.queue[nxt]
+        self._preloaded = {p: d for p, d in self._preloaded.items() if p == path}
+        if path in self._preloaded:
+            if self._queued != path and self.playing:
+                self._queue(path, self._preloaded[path])
+            return
+
+        def load():
+            try:
+                data = None
+                if os.path.getsize(path) <= self.PRELOAD_MAX_BYTES:
+                    with open(path, "rb") as f:
+                        data = f.read()
+            except OSError:
+                return
+            with self._lock:
+                if self.playing and self.index + 1 < len(self.queue) and self.queue[self.index + 1] == path:
+                    if data is not None:
+                        self._preloaded[path] = data
+                    self._queue(path, data)
+        threading.Thread(target=load, name="music-preload", daemon=True).start()
+
+    def _ensure_watcher(self):
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="music-watch", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            self._wake.wait(self.poll)
+            self._wake.clear()
+            with self._lock:
+                if not self.playing or self.paused:
+                    continue
+                try:
+                    busy = pygame.mixer.music.get_busy()
+                    pos = pygame.mixer.music.get_pos()
+                except Exception:
+                    continue
+                if busy:
+                    if self._queued is not None and 0 <= pos < self._last_pos:
+                        self._advanced()
+                    self._last_pos = pos
+                    continue
+                ended = time.perf_counter()
+                if self.index + 1 < len(self.queue):
+                    try:
+                        path = self._start(self.index + 1, ended)
+                        self.stats["auto_advances"] += 1
+                        gui.log(f"Now playing: {library.describe(path)}", "SYSTEM")
+                    except Exception as e:
+                        self.playing = False
+                        gui.log(f"Playback error: {e}", "ERROR")
+                else:
+                    self.playing = False
+
+    def _advanced(self):
+        """The mixer moved on to the queued track by itself."""
+        self.index += 1
+        self._queued = None
+        self._preloaded.pop(self.queue[self.index], None)
+        self.stats["auto_advances"] += 1
+        self.stats["gapless"] += 1
+        self._preload_next()
+        gui.log(f"Now playing: {library.describe(self.queue[self.index])}", "SYSTEM")
+
+    def play(self, paths, start=0):
+        """Replace the queue with paths and start playing paths[start]."""
+        t0 = time.perf_counter()
+        with self._lock:
+            self.queue = list(paths)
+            self._preloaded.clear()
+            return self._start(start, t0)
+
+    def add(self, paths):
+        with self._lock:
+            self.queue.extend(paths)
+            if self.playing:
+                self._preload_next()
+            return len(self.queue) - self.index - 1
+
+    def skip(self, step):
+        """Move step tracks forward or back in the queue; returns the new path or None."""
+        t0 = time.perf_counter()
+        with self._lock:
+            target = self.index + step
+            if not 0 <= target < len(self.queue):
+                return None
+            return self._start(target, t0)
+
+    def shuffle(self):
+        """Shuffle the tracks after the current one; returns how many were shuffled."""
+        import random
+        with self._lock:
+            upcoming = self.queue[self.index + 1:]
+            random.shuffle(upcoming)
+            self.queue[self.index + 1:] = upcoming
+            if self.playing:
+                self._preload_next()
+            return len(upcoming)
+
+    def pause(self):
+        with self._lock:
+            pygame.mixer.music.pause()
+            self.paused = True
+
+    def resume(self):
+        with self._lock:
+            pygame.mixer.music.unpause()
+            self.paused = False
+
+    def stop(self):
+        with self._lock:
+            self.playing = False
+            self.paused = False
+            self._queued = None
+            pygame.mixer.music.stop()
+            try:
+                pygame.mixer.music.unload()  # also drops the queued track
+            except Exception:
+                pass
+
+    def report(self):
+        st = self.stats
+        if not st["switches"]:
+            return "no track switches yet"
+        return (f"{st['switches']} switches, avg {st['switch_total'] / st['switches'] * 1000:.1f} ms, "
+                f"max {st['switch_max'] * 1000:.1f} ms, last {st['switch_last'] * 1000:.1f} ms; "
+                f"{st['auto_advances']} automatic ({st['gapless']} gapless via the mixer queue); "
+                f"preloaded {st['preload_hits']} of {st['preload_hits'] + st['preload_misses']}")
+
+player = PlaybackEngine()
+
+def play_artist(query: str):
+    import random
+    artist, paths = library.by_artist(query)
+    if not paths:
+        return False
+    paths = list(paths)
+    random.shuffle(paths)
+    gui.log(f"Queued {len(paths)} tracks by {artist}.", "SYSTEM")
+    return play_local_music(paths)
+
+def play_local_music(paths):
+    """Play a track (or a list of tracks, queued in order), replacing the current queue."""
+    if not init_mixer():
+        speak("Pygame is not installed. I cannot play local music.")
+        return False
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    try:
+        path = player.play(paths)
+        gui.log(f"Playing local track: {path}", "SYSTEM")
+        speak(f"Playing {library.describe(path)} from local music.")
         return True
     except Exception as e:
         gui.log(f"Playback error: {e}", "ERROR")
         speak("I couldn't play that local file.")
         return False
 
+def queue_local_music(query: str):
+    """'queue bohemian rhapsody', 'add so what to the queue'."""
+    query = re.sub(r"\s+to (?:the |my )?queue$", "", re.sub(r"^up\s+", "", query.strip()))
+    path = find_local_track(query)
+    if not path:
+        speak(f"I couldn't find {query} in your music.")
+        return
+    if not player.playing:
+        play_local_music(path)
+        return
+    ahead = player.add([path])
+    speak(f"Added {library.describe(path)} to the queue." if ahead > 1 else f"{library.describe(path)} is up next.")
+
+def skip_track(step=1):
+    if not init_mixer():
+        return
+    try:
+        path = player.skip(step)
+    except Exception as e:
+        gui.log(f"Playback error: {e}", "ERROR")
+        speak("I couldn't switch tracks.")
+        return
+    if path is None:
+        speak("That's the end of the queue." if step > 0 else "This is the first track in the queue.")
+    else:
+        gui.log(f"Now playing: {path} ({player.report()})", "SYSTEM")
+
+def shuffle_queue():
+    count = player.shuffle()
+    speak(f"Shuffled {count} upcoming tracks." if count > 1 else "There's nothing to shuffle in the queue.")
+
+def playback_stats():
+    report = player.report()
+    gui.log(f"Playback: {report}", "SYSTEM")
+    st = player.stats
+    if st["switches"]:
+        speak(f"Track switches take {st['switch_total'] / st['switches'] * 1000:.0f} milliseconds on average.")
+    else:
+        speak("I haven't switched any tracks yet.")
+
 def stop_music():
-    if pygame is None:
+    if not init_mixer():
         return
-    global current_music_path, music_paused
     try:
-        pygame.mixer.music.stop()
-        current_music_path = None
-        music_paused = False
+        player.stop()
         gui.log("Music stopped.", "SYSTEM")
         speak("Stopped music.")
     except Exception as e:
         gui.log(f"Stop error: {e}", "ERROR")
 
 def pause_music():
-    if pygame is None:
+    if not init_mixer():
         return
-    global music_paused
     try:
-        pygame.mixer.music.pause()
-        music_paused = True
+        player.pause()
         gui.log("Music paused.", "SYSTEM")
         speak("Paused.")
     except Exception as e:
         gui.log(f"Pause error: {e}", "ERROR")
 
 def resume_music():
-    if pygame is None:
+    if not init_mixer():
         return
-    global music_paused
     try:
-        pygame.mixer.music.unpause()
-        music_paused = False
+        player.resume()
         gui.log("Music resumed.", "SYSTEM")
         speak("Resuming music.")
     except Exception as e:
         gui.log(f"Resume error: {e}", "ERROR")
 
 # -------------------------
-# Speech recognition (commands)
+# Filesystem watching (music folder and app folders)
 # -------------------------
-recognizer = sr.Recognizer()
-
-def listen_for_command(timeout=6, phrase_time_limit=8):
-    if _speaking_lock.locked():
-        time.sleep(0.1)
-    with sr.Microphone() as source:
-        gui.update_status("Listening for command...")
-        gui.log("Listening for command...", "SYSTEM")
-        recognizer.adjust_for_ambient_noise(source, duration=0.4)
+class TreeWatcher:
+    """
+    Watches directory trees for files with the given suffixes and reports net
+    changes in batches: on_change(added, removed) once events have been quiet
+    for `quiet` seconds, or after `max_delay` during a long bulk copy. The tree
+    of known files is kept in memory, so a path touched many times is reported
+    once, with whatever state it ended in. Subclasses turn OS notifications (or
+    polling) into _file_added/_file_removed/_walk/_forget calls.
+    """
+    def __init__(self, name, roots, suffixes, on_change, quiet=0.5, max_delay=5.0):
+        self.name = name
+        self.roots = [r for r in roots if r and os.path.isdir(r)]
+        self.suffixes = tuple(suffixes)
+        self.on_change = on_change
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self._files = {}  # dir -> set of matching file names
+        self._subdirs = {}  # dir -> set of subdirectory paths
+        self._pending = set()
+        self._first_event = None
+        self._last_event = None
+        self._thread = None
+        self.stats = {"events": 0, "batches": 0, "added": 0, "removed": 0, "apply_time": 0.0}
+
+    def start(self):
+        """Set up notifications and start watching. Returns False if there is nothing to watch or setup failed."""
+        if not self.roots:
+            return False
+        if self._thread is None:
+            try:
+                self._setup()
+            except Exception as e:
+                _log_system(f"{self.name} watcher failed to start: {e}")
+                return False
+            self._thread = threading.Thread(target=self._run, name=f"watch-{self.name}", daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self):
         try:
-            audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-            text = recognizer.recognize_google(audio)
-            gui.log(text, "You")
-            return text.lower()
-        except sr.WaitTimeoutError:
-            gui.log("No speech detected (timeout).", "SYSTEM")
+            for root in self.roots:
+                self._walk(root, report=False)
+        except Exception as e:
+            _log_system(f"{self.name} watcher failed to start: {e}")
+            return
+        while True:
+            try:
+                self._poll_events(self._next_timeout())
+                self._flush()
+            except Exception as e:
+                _log_system(f"{self.name} watcher error: {e}")
+                time.sleep(1.0)
+
+    def _setup(self):
+        pass
+
+    def _watch_dir(self, d):
+        pass
+
+    def _unwatch_dir(self, d):
+        pass
+
+    def _poll_events(self, timeout):
+        raise NotImplementedError
+
+    def _next_timeout(self):
+        if not self._pending:
             return None
-        except sr.UnknownValueError:
-            gui.log("Couldn't understand audio.", "SYSTEM")
-            speak("I didn't understand. Please say that again.")
+        now = time.time()
+        return max(0.0, min(self._last_event + self.quiet, self._first_event + self.max_delay) - now)
+
+    def _note(self, path):
+        now = time.time()
+        if not self._pending:
+            self._first_event = now
+        self._last_event = now
+        self._pending.add(path)
+        self.stats["events"] += 1
+
+    def _file_added(self, path):
+        if path.lower().endswith(self.suffixes):
+            d, name = os.path.split(path)
+            self._files.setdefault(d, set()).add(name)
+            self._note(path)
+
+    def _file_removed(self, path):
+        d, name = os.path.split(path)
+        names = self._files.get(d)
+        if names and name in names:
+            names.discard(name)
+            self._note(path)
+
+    def _walk(self, top, report=True):
+        """Start tracking a directory tree (new, moved in, or initial)."""
+        parent = os.path.dirname(top)
+        if parent in self._subdirs:
+            self._subdirs[parent].add(top)
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            if d in self._subdirs and d != top:
+                continue
+            self._files.setdefault(d, set())
+            self._subdirs.setdefault(d, set())
+            self._watch_dir(d)
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            self._subdirs[d].add(entry.path)
+                            stack.append(entry.path)
+                        elif entry.name.lower().endswith(self.suffixes):
+                            self._files[d].add(entry.name)
+                            if report:
+                                self._note(entry.path)
+            except OSError:
+                continue
+
+    def _forget(self, top):
+        """Stop tracking a directory tree (deleted or moved out) and report its files as removed."""
+        parent = os.path.dirname(top)
+        if parent in self._subdirs:
+            self._subdirs[parent].discard(top)
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            for name in self._files.pop(d, ()):
+                self._note(os.path.join(d, name))
+            stack.extend(self._subdirs.pop(d, ()))
+            self._unwatch_dir(d)
+
+    def _relist(self, d):
+        """Diff one directory against the tree; used by polling and after an event overflow."""
+        try:
+            with os.scandir(d) as it:
+                entries = list(it)
+        except OSError:
+            self._forget(d)
+            return
+        files = {e.name for e in entries if not e.is_dir(follow_symlinks=False) and e.name.lower().endswith(self.suffixes)}
+        subdirs = {e.path for e in entries if e.is_dir(follow_symlinks=False)}
+        known = self._files.get(d, set())
+        for name in files - known:
+            self._file_added(os.path.join(d, name))
+        for name in known - files:
+            self._file_removed(os.path.join(d, name))
+        for sub in subdirs - self._subdirs.get(d, set()):
+            self._walk(sub)
+        for sub in self._subdirs.get(d, set()) - subdirs:
+            self._forget(sub)
+
+    def _flush(self):
+        if not self._pending or self._next_timeout() > 0:
+            return
+        pending, self._pending = self._pending, set()
+        added, removed = [], []
+        for path in pending:
+            d, name = os.path.split(path)
+            (added if name in self._files.get(d, ()) else removed).append(path)
+        t0 = time.perf_counter()
+        self.on_change(sorted(added), sorted(removed))
+        self.stats["apply_time"] += time.perf_counter() - t0
+        self.stats["batches"] += 1
+        self.stats["added"] += len(added)
+        self.stats["removed"] += len(removed)
+        _log_system(f"{self.name}: {len(added)} added/changed, {len(removed)} removed.")
+
+class InotifyWatcher(TreeWatcher):
+    """Linux inotify through libc (no extra package). inotify is per directory, so every subdirectory gets a watch."""
+    IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x2, 0x8, 0x40, 0x80
+    IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_Q_OVERFLOW, IN_IGNORED = 0x100, 0x200, 0x400, 0x4000, 0x8000
+    IN_ISDIR = 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    def _setup(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wd_dirs = {}
+        self._dir_wds = {}
+
+    def _watch_dir(self, d):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(d), self.MASK)
+        if wd >= 0:
+            self._wd_dirs[wd] = d
+            self._dir_wds[d] = wd
+
+    def _unwatch_dir(self, d):
+        wd = self._dir_wds.pop(d, None)
+        if wd is not None and self._wd_dirs.pop(wd, None) is not None:
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _poll_events(self, timeout):
+        import select
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return
+        buf = os.read(self._fd, 256 * 1024)
+        offset = 0
+        while offset + 16 <= len(buf):
+            wd, mask, _cookie, length = struct.unpack_from("iIII", buf, offset)
+            name = os.fsdecode(buf[offset + 16:offset + 16 + length].split(b"\0", 1)[0])
+            offset += 16 + length
+            if mask & self.IN_Q_OVERFLOW:
+                for d in list(self._files):
+                    self._relist(d)
+                continue
+            if mask & self.IN_IGNORED:
+                d = self._wd_dirs.pop(wd, None)
+                if d is not None and self._dir_wds.get(d) == wd:
+                    del self._dir_wds[d]
+                continue
+            d = self._wd_dirs.get(wd)
+            if d is None or not name:
+                continue
+            path = os.path.join(d, name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._walk(path)
+                elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    self._forget(path)
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                self._file_added(path)
+            elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                self._file_removed(path)
+
+class PollingWatcher(TreeWatcher):
+    """Portable fallback: stat every known directory each interval and re-list only those whose mtime moved."""
+    def __init__(self, *args, interval=5.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self._mtimes = {}
+        self._next_poll = 0.0
+
+    def _watch_dir(self, d):
+        try:
+            self._mtimes[d] = os.stat(d).st_mtime
+        except OSError:
+            pass
+
+    def _unwatch_dir(self, d):
+        self._mtimes.pop(d, None)
+
+    def _poll_events(self, timeout):
+        now = time.time()
+        if self._next_poll > now:
+            time.sleep(min(timeout if timeout is not None else self.interval, self._next_poll - now))
+            if time.time() < self._next_poll:
+                return
+        self._next_poll = time.time() + self.interval
+        for d, mtime in list(self._mtimes.items()):
+            if d not in self._mtimes:
+                continue  # forgotten while re-listing a parent
+            try:
+                current = os.stat(d).st_mtime
+            except OSError:
+                self._forget(d)
+                continue
+            if current != mtime:
+                self._mtimes[d] = current
+                self._relist(d)
+
+def create_tree_watcher(name, roots, suffixes, on_change):
+    """The best watcher FS_WATCH allows on this platform, or None when watching is off."""
+    if FS_WATCH == "off":
+        return None
+    if FS_WATCH in ("auto", "inotify") and sys.platform.startswith("linux"):
+        return InotifyWatcher(name, roots, suffixes, on_change)
+    if FS_WATCH == "inotify":
+        print("inotify is only available on Linux; polling instead.")
+    return PollingWatcher(name, roots, suffixes, on_change, interval=FS_POLL_INTERVAL)
+
+def _apps_changed(added, removed):
+    """Apply watcher batches to installed_apps; a full rescan still reconciles name collisions."""
+    with _app_scan_lock:
+        for path in removed:
+            key = normalize_name(os.path.splitext(os.path.basename(path))[0])
+            if installed_apps.get(key) == path:
+                del installed_apps[key]
+                app_matcher.remove(key)
+        for path in added:
+            key = normalize_name(os.path.splitext(os.path.basename(path))[0])
+            if key and key not in installed_apps:
+                installed_apps[key] = path
+                app_matcher.add(key, path)
+
+_watchers = []
+
+def start_fs_watchers():
+    watchers = [
+        create_tree_watcher("Music folder", [MUSIC_DIR], AUDIO_EXTS, library.update_paths),
+        create_tree_watcher("App folders", _app_scan_roots(), (".lnk", ".exe"), _apps_changed),
+    ]
+    started = []
+    for w in watchers:
+        if w is None:
+            continue
+        if w.start():
+            started.append(w)
+        elif isinstance(w, InotifyWatcher) and FS_WATCH == "auto" and w.roots:
+            _log_system(f"{w.name}: falling back to polling.")
+            fallback = PollingWatcher(w.name, w.roots, w.suffixes, w.on_change, interval=FS_POLL_INTERVAL)
+            if fallback.start():
+                started.append(fallback)
+    _watchers.extend(started)
+    return bool(started)
+
+# -------------------------
+# Shared audio capture
+# -------------------------
+def track_noise_floor(floor, level):
+    """One step of the running noise floor: falls quickly, rises very slowly."""
+    if floor is None:
+        return level
+    if level < floor:
+        return floor + 0.1 * (level - floor)  # follow quiet rooms quickly
+    return floor + 0.0005 * (level - floor)  # ignore speech bursts
+
+class AudioCapture:
+    """
+    One always-open microphone stream writing into a preallocated int16 ring
+    buffer. The wake-word detector and the command recognizer each read from it
+    at their own absolute sample position, so speech that starts right after the
+    wake word is already buffered when the recognizer begins. A noise floor is
+    tracked continuously instead of calibrating before every command.
+    """
+    RATE = 16000
+    FRAME = 512
+    RING_SECONDS = 30
+
+    def __init__(self):
+        self.size = self.RING_SECONDS * self.RATE // self.FRAME * self.FRAME
+        self._ring = None  # allocated in start() so importing this module stays cheap
+        self._written = 0
+        self._cond = threading.Condition()
+        self._stream = None
+        self.noise_floor = None
+        self.overruns = 0
+
+    @property
+    def running(self):
+        return self._stream is not None
+
+    def start(self):
+        """Open the microphone and start the capture thread. Returns False if unavailable."""
+        if self._stream is not None:
+            return True
+        if not pyaudio:
+            return False
+        self._allocate()
+        try:
+            pa = pyaudio.PyAudio()
+            self._stream = pa.open(rate=self.RATE, channels=1, format=pyaudio.paInt16,
+                                   input=True, frames_per_buffer=self.FRAME)
+        except Exception as e:
+            gui.log(f"Microphone open error: {e}", "ERROR")
+            return False
+        threading.Thread(target=self._run, name="audio-capture", daemon=True).start()
+        return True
+
+    def _allocate(self):
+        if self._ring is None:
+            self._ring = np.zeros(self.size, dtype=np.int16)
+            self._ring_bytes = memoryview(self._ring).cast("B")
+            self._scratch = np.zeros(self.FRAME, dtype=np.float32)
+
+    def position(self):
+        return self._written
+
+    def rms(self, frame):
+        scratch = self._scratch[:len(frame)]
+        np.copyto(scratch, frame, casting="unsafe")
+        return float(np.sqrt(np.dot(scratch, scratch) / len(frame)))
+
+    def _track_noise(self, level):
+        self.noise_floor = track_noise_floor(self.noise_floor, level)
+
+    def speech_threshold(self, ratio=3.0, minimum=150.0):
+        return max(minimum, (self.noise_floor or 0.0) * ratio)
+
+    def _run(self):
+        frame_bytes = self.FRAME * 2
+        while True:
+            try:
+                data = self._stream.read(self.FRAME, exception_on_overflow=False)
+            except Exception as e:
+                gui.log(f"Audio capture error: {e}", "ERROR")
+                time.sleep(0.5)
+                continue
+            start = self._written % self.size
+            self._ring_bytes[start * 2:start * 2 + frame_bytes] = data
+            self._track_noise(self.rms(self._ring[start:start + self.FRAME]))
+            with self._cond:
+                self._written += self.FRAME
+                self._cond.notify_all()
+
+    def read_into(self, pos, out, timeout=None):
+        """
+        Copy samples [pos, pos + len(out)) into out, waiting for them if needed.
+        Returns the position after the read, or None on timeout. A reader that
+        fell more than a ring behind is moved forward to the oldest sample kept.
+        """
+        n = len(out)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._written >= pos + n, timeout):
+                return None
+            oldest = self._written - self.size
+            if pos < oldest:
+                self.overruns += 1
+                pos = oldest
+        i = pos % self.size
+        first = min(n, self.size - i)
+        out[:first] = self._ring[i:i + first]
+        if first < n:
+            out[first:] = self._ring[:n - first]
+        return pos + n
+
+    def samples(self, start, end):
+        """
+        Samples [start, end) that are still in the ring. The result is shorter
+        than asked for when part of the range is not written yet or was already
+        overwritten; it never contains unwritten memory.
+        """
+        with self._cond:
+            start = max(start, self._written - self.size)
+            end = min(end, self._written)
+        out = np.zeros(max(0, end - start), dtype=np.int16)
+        if len(out):
+            self.read_into(start, out, timeout=0)
+        return out
+
+capture = AudioCapture()
+
+# -------------------------
+# Speech recognition (commands)
+# -------------------------
+_recognizer = None
+_ambient_calibrated = False
+
+def get_recognizer():
+    global _recognizer
+    if _recognizer is None:
+        _recognizer = sr.Recognizer()
+    return _recognizer
+
+class VoiceActivityDetector:
+    """
+    Streaming speech/non-speech endpointer for int16 mono audio. Features for
+    all complete frames in a block are computed at once with NumPy: RMS energy
+    against a noise floor, zero-crossing rate and spectral flatness. Loud but
+    noise-like frames (flat spectrum and high ZCR) don't count as speech.
+    Without a floor from the live capture, one is tracked frame by frame from
+    min_rms, the same way AudioCapture does, and kept across utterances.
+    An utterance starts after min_speech_ms of speech and ends once hangover_ms
+    passes without any.
+    """
+    def __init__(self, rate=16000, frame_ms=16, hangover_ms=VAD_HANGOVER_MS, min_speech_ms=48,
+                 energy_ratio=3.0, min_rms=150.0, max_flatness=0.5, max_zcr=0.3):
+        self.rate = rate
+        self.frame_len = int(rate * frame_ms / 1000)
+        self.hangover = max(1, int(hangover_ms / frame_ms))
+        self.min_speech = max(1, int(min_speech_ms / frame_ms))
+        self.energy_ratio = energy_ratio
+        self.min_rms = min_rms
+        self.max_flatness = max_flatness
+        self.max_zcr = max_zcr
+        self._window = np.hanning(self.frame_len).astype(np.float32)
+        self._noise = min_rms / energy_ratio
+        self.reset()
+
+    def reset(self, keep_pending=False):
+        """Start a new utterance. keep_pending carries over samples not yet framed."""
+        if not keep_pending:
+            self._pending = np.zeros(0, dtype=np.int16)
+        self._frame_index = 0
+        self._run = 0
+        self.speech_start = None  # sample offsets from the first sample fed
+        self.speech_end = None
+        self.endpoint = None
+
+    @property
+    def started(self):
+        return self.speech_start is not None
+
+    @property
+    def ended(self):
+        return self.endpoint is not None
+
+    @property
+    def consumed(self):
+        """Samples framed so far in this utterance."""
+        return self._frame_index * self.frame_len
+
+    @property
+    def endpoint_latency(self):
+        """Audio seconds between the last speech frame and the endpoint decision."""
+        if self.endpoint is None:
             return None
-        except sr.RequestError as e:
-            gui.log(f"Speech service error: {e}", "ERROR")
-            speak("I couldn't reach the speech service.")
+        return (self.endpoint - self.speech_end) / self.rate
+
+    def features(self, frames):
+        """Per-frame (rms, zcr, flatness) for a (n_frames, frame_len) float32 array."""
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        mag = np.abs(np.fft.rfft(frames * self._window, axis=1)) + 1e-9
+        flatness = np.exp(np.mean(np.log(mag), axis=1)) / np.mean(mag, axis=1)
+        return rms, zcr, flatness
+
+    def classify(self, frames, noise_floor=None):
+        rms, zcr, flatness = self.features(frames)
+        if noise_floor is None:
+            noise_floor = np.empty_like(rms)
+            floor = self._noise
+            for i, level in enumerate(rms.tolist()):
+                noise_floor[i] = floor
+                floor = track_noise_floor(floor, level)
+            self._noise = floor
+        loud = rms > np.maximum(self.min_rms, noise_floor * self.energy_ratio)
+        noise_like = (flatness > self.max_flatness) & (zcr > self.max_zcr)
+        return loud & ~noise_like
+
+    def process(self, samples, noise_floor=None):
+        """Feed the next block of samples. Returns True once the utterance has ended."""
+        if self.ended:
+            return True
+        data = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        n_frames = len(data) // self.frame_len
+        self._pending = data[n_frames * self.frame_len:].copy()
+        if not n_frames:
+            return False
+        frames = data[:n_frames * self.frame_len].reshape(n_frames, self.frame_len).astype(np.float32)
+        for speech in self.classify(frames, noise_floor):
+            i = self._frame_index
+            self._frame_index += 1
+            if speech:
+                self._run += 1
+                if not self.started and self._run >= self.min_speech:
+                    self.speech_start = (i + 1 - self._run) * self.frame_len
+                if self.started:
+                    self.speech_end = (i + 1) * self.frame_len
+            else:
+                self._run = 0
+                if self.started and i + 1 - self.speech_end // self.frame_len >= self.hangover:
+                    self.endpoint = (i + 1) * self.frame_len
+                    return True
+        return False
+
+class RecognizerSession:
+    """Default streaming session: buffers audio and transcribes it in one go on finish()."""
+    def __init__(self, backend, rate):
+        self.backend = backend
+        self.rate = rate
+        self.partial = None
+        self._chunks = []
+
+    def feed(self, samples):
+        self._chunks.append(samples.tobytes())
+        return self.partial
+
+    def finish(self):
+        return self.backend.transcribe(np.frombuffer(b"".join(self._chunks), dtype=np.int16), self.rate)
+
+class RecognizerBackend:
+    """
+    Speech-to-text backend. transcribe() takes a whole int16 utterance; stream()
+    returns a session whose feed() may report a partial hypothesis while the
+    user is still talking. Failures raise sr.UnknownValueError / sr.RequestError
+    like speech_recognition does.
+    """
+    name = "base"
+    streaming = False
+
+    def transcribe(self, samples, rate):
+        raise NotImplementedError
+
+    def stream(self, rate):
+        return RecognizerSession(self, rate)
+
+class GoogleBackend(RecognizerBackend):
+    name = "google"
+
+    def transcribe(self, samples, rate):
+        return get_recognizer().recognize_google(sr.AudioData(samples.tobytes(), rate, 2))
+
+class VoskSession:
+    def __init__(self, model, rate):
+        self._rec = vosk.KaldiRecognizer(model, rate)
+        self._final = []
+        self.partial = None
+
+    def feed(self, samples):
+        if self._rec.AcceptWaveform(samples.tobytes()):
+            text = json.loads(self._rec.Result()).get("text", "")
+            if text:
+                self._final.append(text)
+            self.partial = " ".join(self._final) or None
+        else:
+            text = json.loads(self._rec.PartialResult()).get("partial", "")
+            self.partial = " ".join(self._final + ([text] if text else [])) or None
+        return self.partial
+
+    def finish(self):
+        text = json.loads(self._rec.FinalResult()).get("text", "")
+        text = " ".join(self._final + ([text] if text else []))
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+class VoskBackend(RecognizerBackend):
+    """Offline CPU recognition with Vosk (pip install vosk, plus a model at VOSK_MODEL_PATH)."""
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if not vosk:
+            raise sr.RequestError("vosk is not installed")
+        with self._lock:
+            if self._model is None:
+                if not os.path.isdir(self.model_path):
+                    raise sr.RequestError(f"Vosk model not found at {self.model_path}")
+                vosk.SetLogLevel(-1)
+                self._model = vosk.Model(self.model_path)
+        return self._model
+
+    def stream(self, rate):
+        return VoskSession(self._get_model(), rate)
+
+    def transcribe(self, samples, rate):
+        session = self.stream(rate)
+        session.feed(samples)
+        return session.finish()
+
+class TranscriptSession:
+    def __init__(self, text, rate, words_per_second):
+        self._words = text.split()
+        self._text = text
+        self._rate = rate
+        self._wps = words_per_second
+        self._fed = 0
+        self.partial = None
+
+    def feed(self, samples):
+        self._fed += len(samples)
+        shown = int(self._fed / self._rate * self._wps)
+        self.partial = " ".join(self._words[:shown]) or None
+        return self.partial
+
+    def finish(self):
+        if not self._text:
+            raise sr.UnknownValueError()
+        return self._text
+
+class TranscriptBackend(RecognizerBackend):
+    """
+    Deterministic stand-in for tests and benchmarks: ignores the audio and
+    returns scripted transcripts in order, revealing words at a fixed speaking
+    rate as audio is fed. An empty line means "not understood".
+    """
+    name = "transcript"
+    streaming = True
+
+    def __init__(self, transcripts, words_per_second=3.0):
+        self._transcripts = collections.deque(transcripts)
+        self._lock = threading.Lock()
+        self.words_per_second = words_per_second
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls([line.strip() for line in f])
+
+    def _next(self):
+        with self._lock:
+            return self._transcripts.popleft() if self._transcripts else ""
+
+    def stream(self, rate):
+        return TranscriptSession(self._next(), rate, self.words_per_second)
+
+    def transcribe(self, samples, rate):
+        return self.stream(rate).finish()
+
+_speech_backend = None
+recognizer_stats = {}
+
+def create_speech_backend(name):
+    if name == "vosk":
+        return VoskBackend(VOSK_MODEL_PATH)
+    if name == "transcript":
+        return TranscriptBackend.from_file(SPEECH_TRANSCRIPT_FILE) if SPEECH_TRANSCRIPT_FILE else TranscriptBackend([])
+    if name != "google":
+        print(f"Unknown SPEECH_BACKEND '{name}', using google.")
+    return GoogleBackend()
+
+def get_speech_backend():
+    global _speech_backend
+    if _speech_backend is None:
+        _speech_backend = create_speech_backend(SPEECH_BACKEND)
+    return _speech_backend
+
+def set_speech_backend(backend):
+    global _speech_backend
+    _speech_backend = backend
+
+def record_recognition(backend, latency, first_partial=None, error=None):
+    """Per-backend latency/error counters; latency runs from end of audio to final text."""
+    stats = recognizer_stats.setdefault(backend.name, {
+        "calls": 0, "errors": 0, "latency_total": 0.0, "latency_last": None,
+        "first_partial_total": 0.0, "partials": 0,
+    })
+    stats["calls"] += 1
+    if error is not None:
+        stats["errors"] += 1
+        stats["last_error"] = error
+        return
+    stats["latency_total"] += latency
+    stats["latency_last"] = latency
+    if first_partial is not None:
+        stats["first_partial_total"] += first_partial
+        stats["partials"] += 1
+
+def recognizer_report():
+    lines = []
+    for name, st in recognizer_stats.items():
+        ok = st["calls"] - st["errors"]
+        avg = st["latency_total"] / ok * 1000 if ok else 0.0
+        partial = f", first partial {st['first_partial_total'] / st['partials'] * 1000:.0f} ms" if st["partials"] else ""
+        lines.append(f"{name}: {st['calls']} calls, {st['errors']} errors, final text {avg:.0f} ms after end of speech{partial}")
+    return lines
+
+STABLE_PARTIAL_UPDATES = 3  # identical partials in a row before routing may act on them
+
+last_endpoint = {}
+
+def capture_utterance(start, timeout, phrase_time_limit, preroll=0.1, session=None, earliest=None):
+    """
+    Read from the shared capture starting at sample `start` until the VAD says
+    the speaker stopped. Returns (first_sample, last_sample) or None if nobody
+    spoke in time. If speech is already under way at `start`, the utterance is
+    taken from `earliest` instead so words spoken over our prompt aren't cut.
+    With a streaming session, audio is fed as it arrives, and capture stops
+    early once a stable partial is already a complete command.
+    """
+    rate = AudioCapture.RATE
+    frame = np.zeros(AudioCapture.FRAME, dtype=np.int16)
+    vad = VoiceActivityDetector(rate=rate)
+    pos = start
+    began = None
+    partial, stable = None, 0
+    t0 = time.perf_counter()
+    while True:
+        nxt = capture.read_into(pos, frame, timeout=timeout + 1)
+        if nxt is None:
+            return None
+        pos = nxt
+        ended = vad.process(frame, capture.noise_floor)
+        if not vad.started:
+            if pos - start > timeout * rate:
+                return None
+            continue
+        early = False
+        if began is None:
+            if vad.speech_start == 0 and earliest is not None:
+                began = earliest  # the user talked over the acknowledgement
+            else:
+                began = max(start, start + vad.speech_start - int(preroll * rate))
+            chunk = capture.samples(began, pos)
+        else:
+            chunk = frame
+        if session is not None:
+            hypothesis = session.feed(chunk)
+            if hypothesis and "first_partial_ms" not in last_endpoint:
+                last_endpoint["first_partial_ms"] = int((time.perf_counter() - t0) * 1000)
+            stable = stable + 1 if hypothesis and hypothesis == partial else 0
+            partial = hypothesis
+            early = stable >= STABLE_PARTIAL_UPDATES and router.is_complete(partial)
+        if ended or early or pos - began >= phrase_time_limit * rate:
+            last_endpoint.update({
+                "silence_ms": int(vad.endpoint_latency * 1000) if ended else None,
+                "early_partial": partial if early else None,
+                "behind_live_ms": int((capture.position() - pos) * 1000 / rate),
+                "utterance_ms": int((pos - began) * 1000 / rate),
+            })
+            return began, pos
+
+def read_wav_mono(path, rate=16000):
+    """Load a 16-bit PCM WAV file as mono int16 at `rate`."""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM WAV files are supported.")
+        channels = wf.getnchannels()
+        source_rate = wf.getframerate()
+        data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if source_rate != rate:
+        t_out = np.arange(int(len(data) * rate / source_rate)) / rate
+        data = np.interp(t_out, np.arange(len(data)) / source_rate, data).astype(np.int16)
+    return data
+
+def vad_segments_from_wav(path, block=AudioCapture.FRAME, **vad_options):
+    """
+    Run the VAD over a WAV file in capture-sized blocks, as if it were live.
+    Returns a list of (start_s, end_s, endpoint_latency_s) per utterance.
+    """
+    vad = VoiceActivityDetector(**vad_options)
+    samples = read_wav_mono(path, vad.rate)
+    segments = []
+    offset = 0
+    for i in range(0, len(samples), block):
+        if vad.process(samples[i:i + block]):
+            segments.append(((offset + vad.speech_start) / vad.rate, (offset + vad.speech_end) / vad.rate,
+                             vad.endpoint_latency))
+            offset += vad.consumed
+            vad.reset(keep_pending=True)
+    if vad.started:
+        segments.append(((offset + vad.speech_start) / vad.rate, (offset + vad.speech_end) / vad.rate, None))
+    return segments
+
+def _strip_acknowledgement(text):
+    """Drop our own 'Yes, sir' if the pre-roll picked it up from the speakers."""
+    words = ["yes"] + re.findall(r"\w+", user_data["name"])
+    pattern = r"^\W*" + r"\W+".join(map(re.escape, words)) + r"\b\W*"
+    return re.sub(pattern, "", text, count=1, flags=re.IGNORECASE)
+
+_headless_input = None  # iterator of typed/replayed utterances when running headless
+
+def listen_for_command(timeout=6, phrase_time_limit=8, start=None):
+    """
+    Recognize one command. With the shared capture running, audio is taken from
+    the ring buffer from the moment any pending speech output (such as the
+    acknowledgement) finishes. `start` is the wake-word boundary; audio back to
+    it is only used when the user was already speaking over the acknowledgement.
+    """
+    if _headless_input is not None:
+        text = next(_headless_input, None)
+        if text is None:
             return None
+        gui.log(text, "You")
+        return text.lower()
+    # don't record our own voice: prompts like "Who is the recipient?" must finish first
+    speech.wait_idle(timeout=30)
+    recognizer = get_recognizer()
+    gui.update_status("Listening for command...")
+    gui.log("Listening for command...", "SYSTEM")
+    backend = get_speech_backend()
+    first_partial = None
+    try:
+        if capture.running:
+            last_endpoint.clear()
+            session = backend.stream(AudioCapture.RATE)
+            span = capture_utterance(capture.position(), timeout, phrase_time_limit, session=session,
+                                     earliest=start)
+            if span is None:
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            gui.log(f"Endpoint: {last_endpoint}", "SYSTEM")
+            if "first_partial_ms" in last_endpoint:
+                first_partial = last_endpoint["first_partial_ms"] / 1000
+            t_end = time.perf_counter()
+            text = session.finish()
+        else:
+            global _ambient_calibrated
+            with sr.Microphone() as source:
+                if not _ambient_calibrated:
+                    recognizer.adjust_for_ambient_noise(source, duration=0.4)
+                    _ambient_calibrated = True
+                audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+            samples = np.frombuffer(audio.get_raw_data(convert_rate=AudioCapture.RATE, convert_width=2), dtype=np.int16)
+            t_end = time.perf_counter()
+            text = backend.transcribe(samples, AudioCapture.RATE)
+        record_recognition(backend, time.perf_counter() - t_end, first_partial)
+        if start is not None:
+            text = _strip_acknowledgement(text)
+        gui.log(text, "You")
+        return text.lower()
+    except sr.WaitTimeoutError:
+        gui.log("No speech detected (timeout).", "SYSTEM")
+        return None
+    except sr.UnknownValueError:
+        record_recognition(backend, None, error="not understood")
+        gui.log("Couldn't understand audio.", "SYSTEM")
+        speak("I didn't understand. Please say that again.")
+        return None
+    except sr.RequestError as e:
+        record_recognition(backend, None, error=str(e))
+        gui.log(f"Speech service error: {e}", "ERROR")
+        speak("I couldn't reach the speech service.")
+        return None
 
 # -------------------------
 # Porcupine wake-word thread
 # -------------------------
 wake_queue = queue.Queue()
 
-def porcupine_worker():
-    if pvporcupine is None or pyaudio is None:
+def create_wake_engine():
+    if not pvporcupine or not pyaudio:
         gui.log("Porcupine or PyAudio not installed; wake-word disabled.", "SYSTEM")
-        return
+        return None
     try:
         if PICOVOICE_ACCESS_KEY:
-            pv = pvporcupine.create(access_key=PICOVOICE_ACCESS_KEY, keywords=WAKE_KEYWORDS)
-        else:
-            pv = pvporcupine.create(keywords=WAKE_KEYWORDS)
+            return pvporcupine.create(access_key=PICOVOICE_ACCESS_KEY, keywords=WAKE_KEYWORDS)
+        return pvporcupine.create(keywords=WAKE_KEYWORDS)
     except Exception as e:
         gui.log(f"Porcupine init error: {e}", "ERROR")
         speak("Wake word engine failed. Wake word disabled.")
-        return
+        return None
 
-    pa = pyaudio.PyAudio()
-    try:
-        stream = pa.open(
-            rate=pv.sample_rate,
-            channels=1,
-            format=pyaudio.paInt16,
-            input=True,
-            frames_per_buffer=pv.frame_length
-        )
-    except Exception as e:
-        gui.log(f"Microphone open error: {e}", "ERROR")
+def porcupine_worker(pv=None):
+    """Run the wake-word engine over the shared capture; puts the wake boundary sample on wake_queue."""
+    if pv is None:
+        pv = create_wake_engine()
+        if pv is None:
+            return
+    if pv.sample_rate != AudioCapture.RATE or not capture.start():
+        gui.log("Wake-word engine can't read from the microphone capture.", "ERROR")
         speak("Could not open microphone for wake word detection.")
         pv.delete()
         return
 
     gui.log("Wake-word listener started.", "SYSTEM")
     gui.update_status("Listening for wake word 'terminator'...")
+    frame = np.zeros(pv.frame_length, dtype=np.int16)
+    pos = capture.position()
     while True:
         try:
-            pcm = stream.read(pv.frame_length, exception_on_overflow=False)
-            pcm = np.frombuffer(pcm, dtype=np.int16)
-            keyword_index = pv.process(pcm)
+            pos = capture.read_into(pos, frame)
+            keyword_index = pv.process(frame)
             if keyword_index >= 0:
-                if _speaking_lock.locked():
-                    time.sleep(0.4)
-                wake_queue.put(True)
+                speech.interrupt()
+                wake_queue.put(pos)
         except Exception as e:
             gui.log(f"Porcupine loop error: {e}", "ERROR")
             time.sleep(0.5)
@@ -504,84 +2767,702 @@ def porcupine_worker():
 # -------------------------
 # New Feature Workers
 # -------------------------
+class ReminderScheduler:
+    """
+    Min-heap of pending reminders keyed on fire time.
+    The worker sleeps on a condition variable until the earliest deadline, and is
+    woken early only when a reminder that fires sooner is added. Cancelled entries
+    are dropped lazily when they reach the top of the heap.
+    """
+    MAX_WAIT = 60.0  # re-read the wall clock at least this often (clock changes, sleep)
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._cancelled = 0
+        self.last_fired = None
+
+    def _push(self, rid, when, message):
+        if when.tzinfo is not None:
+            when = when.astimezone().replace(tzinfo=None)  # the heap holds naive local times only
+        entry = [when, rid, message, True]
+        self._entries[rid] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._cond.notify()
+
+    def _drop(self, rid):
+        entry = self._entries.pop(rid, None)
+        if entry is None:
+            return None
+        entry[3] = False
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+            self._heap = [e for e in self._heap if e[3]]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return entry
+
+    def _prune_top(self):
+        while self._heap and not self._heap[0][3]:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+    def add(self, when, message):
+        with self._cond:
+            rid = next(self._ids)
+            self._push(rid, when, message)
+            return rid
+
+    def cancel(self, rid):
+        with self._cond:
+            return self._drop(rid) is not None
+
+    def cancel_all(self):
+        with self._cond:
+            count = len(self._entries)
+            self._heap.clear()
+            self._entries.clear()
+            self._cancelled = 0
+            return count
+
+    def snooze(self, rid=None, minutes=10):
+        """Push a pending reminder back, or re-arm the last fired one when rid is None."""
+        with self._cond:
+            if rid is None:
+                if self.last_fired is None:
+                    return None
+                message = self.last_fired[1]
+                self.last_fired = None
+                when = datetime.datetime.now() + datetime.timedelta(minutes=minutes)
+                rid = next(self._ids)
+            else:
+                entry = self._drop(rid)
+                if entry is None:
+                    return None
+                message = entry[2]
+                when = max(entry[0], datetime.datetime.now()) + datetime.timedelta(minutes=minutes)
+            self._push(rid, when, message)
+            return rid, when
+
+    def pending(self):
+        with self._cond:
+            return sorted((e[0], e[1], e[2]) for e in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _pop_due(self, now):
+        due = []
+        self._prune_top()
+        while self._heap and self._heap[0][0] <= now:
+            when, rid, message, _ = heapq.heappop(self._heap)
+            del self._entries[rid]
+            due.append((when, rid, message))
+            self._prune_top()
+        return due
+
+    def run(self, fire):
+        """Block forever, calling fire(rid, message) for each reminder as it comes due."""
+        while True:
+            with self._cond:
+                now = datetime.datetime.now()
+                due = self._pop_due(now)
+                if not due:
+                    timeout = None
+                    if self._heap:
+                        timeout = min(self.MAX_WAIT, max(0.0, (self._heap[0][0] - now).total_seconds()))
+                    self._cond.wait(timeout)
+                    continue
+                self.last_fired = due[-1][1:]
+            for _, rid, message in due:
+                try:
+                    fire(rid, message)
+                except Exception as e:
+                    _log_system(f"Reminder {rid} failed to fire: {e}")
+
+reminders = ReminderScheduler()
+
 def reminder_worker():
     """Worker thread to handle reminders and alarms."""
-    while True:
+    def fire(rid, message):
         try:
-            timestamp, message = reminders_queue.get(timeout=1)
-            now = datetime.datetime.now()
-            if now >= timestamp:
-                speak(f"Reminder: {message}")
-                gui.log(f"REMINDER: {message}", "REMINDER")
-            else:
-                reminders_queue.put((timestamp, message))
-                time.sleep(1)
-        except queue.Empty:
-            time.sleep(1)
+            speak(f"Reminder: {message}", priority=SpeechQueue.HIGH)
+            gui.log(f"REMINDER: {message}", "REMINDER")
         except Exception as e:
             gui.log(f"Reminder worker error: {e}", "ERROR")
-            time.sleep(1)
+    reminders.run(fire)
+
+def list_reminders():
+    pending = reminders.pending()
+    if not pending:
+        speak("You have no pending reminders.")
+        return
+    speak(f"You have {len(pending)} pending reminder{'s' if len(pending) != 1 else ''}.")
+    for when, rid, message in pending[:5]:
+        gui.log(f"#{rid} {when.strftime('%Y-%m-%d %H:%M')} {message}", "REMINDER")
+        speak(f"Number {rid}, at {when.strftime('%I:%M %p on %A')}: {message}")
+
+def cancel_reminder(cmd: str):
+    if "all" in cmd.split():
+        count = reminders.cancel_all()
+        speak(f"Cancelled {count} reminder{'s' if count != 1 else ''}.")
+        return
+    m = re.search(r"reminder (?:number )?(\d+)", cmd)
+    if not m:
+        speak("Which reminder number should I cancel?")
+        return
+    rid = int(m.group(1))
+    if reminders.cancel(rid):
+        speak(f"Reminder {rid} cancelled.")
+    else:
+        speak(f"I couldn't find reminder {rid}.")
+
+def snooze_reminder(cmd: str):
+    m = re.search(r"(\d+)\s*minute", cmd)
+    minutes = int(m.group(1)) if m else 10
+    m = re.search(r"reminder\s+(?:number\s+)?(\d+)", cmd)
+    result = reminders.snooze(int(m.group(1)) if m else None, minutes)
+    if result is None:
+        speak("There is no reminder to snooze.")
+        return
+    rid, when = result
+    speak(f"Reminder {rid} snoozed until {when.strftime('%I:%M %p')}.")
 
 # -------------------------
 # New image generation feature
 # -------------------------
-def generate_image(prompt: str):
-    if replicate is None:
-        speak("Image generation is not available. Please install the 'replicate' library.")
-        gui.log("Image generation library 'replicate' not found.", "ERROR")
-        return
-    if not REPLICATE_API_TOKEN:
-        speak("Image generation is not configured. Please add your Replicate API token.")
+class ImageBackend:
+    """Turns a prompt plus model params into encoded image bytes."""
+    name = "base"
+
+    def available(self):
+        return True
+
+    def generate(self, prompt, params):
+        raise NotImplementedError
+
+class ReplicateImageBackend(ImageBackend):
+    name = "replicate"
+
+    def __init__(self, model):
+        self.model = model
+
+    def available(self):
+        if not replicate:
+            return "Image generation is not available. Please install the 'replicate' library."
+        if not REPLICATE_API_TOKEN:
+            return "Image generation is not configured. Please add your Replicate API token."
+        return True
+
+    def generate(self, prompt, params):
+        output = replicate.run(self.model, input={"prompt": prompt, **params})
+        item = output[0] if isinstance(output, (list, tuple)) else output
+        if not item:
+            return None
+        if hasattr(item, "read"):  # newer clients return file objects
+            return item.read()
+        response = http.session().get(str(item), timeout=60)
+        response.raise_for_status()
+        return response.content
+
+class LocalImageBackend(ImageBackend):
+    """Offline stand-in: draws the prompt onto a plain card after an optional delay."""
+    name = "local"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def generate(self, prompt, params):
+        time.sleep(self.delay)
+        width, height = params.get("width", 512), params.get("height", 512)
+        shade = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:6], 16)
+        img = Image.new("RGB", (width, height), ((shade >> 16) & 255, (shade >> 8) & 255, shade & 255))
+        ImageDraw.Draw(img).text((16, 16), prompt, fill=(255, 255, 255))
+        out = io.BytesIO()
+        img.save(out, format="PNG")
+        return out.getvalue()
+
+def create_image_backend(name):
+    if name == "local":
+        return LocalImageBackend(float(os.getenv("IMAGE_LOCAL_DELAY") or 0))
+    if name != "replicate":
+        print(f"Unknown IMAGE_BACKEND '{name}', using replicate.")
+    return ReplicateImageBackend(IMAGE_MODEL)
+
+class ImageCache:
+    """
+    Content-addressed store of generated images: files are named by the sha256
+    of their bytes, and index.json maps a request key (backend, prompt, params)
+    to the file so repeat requests never reach the backend.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._index = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(backend, prompt, params):
+        raw = json.dumps([backend, " ".join(prompt.lower().split()), params], sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.root, "index.json"), "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def get(self, key):
+        with self._lock:
+            name = self._load().get(key)
+        if name:
+            path = os.path.join(self.root, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put(self, key, data):
+        name = hashlib.sha256(data).hexdigest() + ".png"
+        path = os.path.join(self.root, name)
+        os.makedirs(self.root, exist_ok=True)
+        if not os.path.exists(path):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        with self._lock:
+            index = self._load()
+            index[key] = name
+            tmp = os.path.join(self.root, "index.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp, os.path.join(self.root, "index.json"))
+        return path
+
+class ImageJob:
+    def __init__(self, job_id, prompt, params, key):
+        self.id = job_id
+        self.prompt = prompt
+        self.params = params
+        self.key = key
+        self.state = "queued"  # queued | running | done | failed | cancelled
+        self.created = time.time()
+        self.finished = None
+        self.path = None
+        self.error = None
+        self.requests = 1
+        self.future = None
+
+class ImageJobManager:
+    """
+    Runs image generations on a fixed-size pool with a bounded backlog. A
+    request matching a job already in flight joins that job instead of paying
+    for a second generation, and finished outputs are served from the cache.
+    on_done(job) is called once per job that completes or fails.
+    """
+    def __init__(self, backend, cache, max_concurrent=2, max_jobs=8, on_done=None):
+        self.backend = backend
+        self.cache = cache
+        self.max_jobs = max_jobs
+        self.on_done = on_done
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="image")
+        self._lock = threading.Lock()
+        self._inflight = {}  # request key -> job
+        self._ids = itertools.count(1)
+        self.stats = {"submitted": 0, "cache_hits": 0, "deduped": 0, "rejected": 0,
+                      "completed": 0, "failed": 0, "cancelled": 0, "latency_total": 0.0}
+
+    def submit(self, prompt, params=None):
+        """Return (status, job_or_path); status is cached | joined | queued | full."""
+        params = params or {}
+        key = self.cache.key(self.backend.name, prompt, params)
+        path = self.cache.get(key)
+        with self._lock:
+            if path:
+                self.stats["cache_hits"] += 1
+                return "cached", path
+            job = self._inflight.get(key)
+            if job is not None:
+                job.requests += 1
+                self.stats["deduped"] += 1
+                return "joined", job
+            if len(self._inflight) >= self.max_jobs:
+                self.stats["rejected"] += 1
+                return "full", None
+            job = ImageJob(next(self._ids), prompt, params, key)
+            self._inflight[key] = job
+            self.stats["submitted"] += 1
+            job.future = self._pool.submit(self._run, job)
+        return "queued", job
+
+    def _forget(self, job):
+        """Drop job from the in-flight table unless a newer job for the same request replaced it."""
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+
+    def _run(self, job):
+        with self._lock:
+            if job.state == "cancelled":
+                self._forget(job)
+                return
+            job.state = "running"
+        try:
+            data = self.backend.generate(job.prompt, job.params)
+            path = self.cache.put(job.key, data) if data else None
+        except Exception as e:
+            data, path, job.error = None, None, e
+        with self._lock:
+            self._forget(job)
+            job.finished = time.time()
+            if job.state == "cancelled":
+                return  # the output is still cached for next time, just not shown
+            if path:
+                job.state, job.path = "done", path
+                self.stats["completed"] += 1
+                self.stats["latency_total"] += job.finished - job.created
+            else:
+                job.state = "failed"
+                self.stats["failed"] += 1
+        if self.on_done:
+            self.on_done(job)
+
+    def active(self):
+        with self._lock:
+            return sorted(self._inflight.values(), key=lambda j: j.id)
+
+    def cancel(self, all_jobs=False):
+        """
+        Cancel the newest pending job (or all of them); returns the cancelled jobs.
+        A job already running finishes in the background and only fills the cache.
+        """
+        with self._lock:
+            jobs = sorted(self._inflight.values(), key=lambda j: j.id, reverse=True)
+            jobs = jobs if all_jobs else jobs[:1]
+            for job in jobs:
+                job.state = "cancelled"
+                self.stats["cancelled"] += 1
+                job.future.cancel()
+                self._forget(job)
+        return jobs
+
+_image_jobs = None
+
+def _open_image(path):
+    if headless_skip(f"opening {path}"):
         return
-    
-    gui.log(f"Generating image for prompt: {prompt}", "SYSTEM")
-    speak(f"Generating an image of {prompt}. This may take a moment.")
-    
-    try:
-        model = "stability-ai/sdxl"
-        output = replicate.run(
-            model,
-            input={"prompt": prompt}
-        )
-        if output and output[0]:
-            image_url = output[0]
-            gui.log(f"Generated image URL: {image_url}", "SYSTEM")
-            webbrowser.open(image_url)
-            speak("I have generated and opened the image for you.")
+    webbrowser.open(pathlib.Path(path).as_uri())
+
+def _image_job_done(job):
+    if job.state == "done":
+        gui.log(f"Generated image for '{job.prompt}': {job.path}", "SYSTEM")
+        _open_image(job.path)
+        speak("I have generated and opened the image for you.")
+    else:
+        if job.error:
+            gui.log(f"Image generation error: {job.error}", "ERROR")
+            speak("I encountered an error while trying to generate the image.")
         else:
             speak("I couldn't generate an image with that prompt.")
-    except Exception as e:
-        gui.log(f"Image generation error: {e}", "ERROR")
-        speak("I encountered an error while trying to generate the image.")
+
+def get_image_jobs():
+    global _image_jobs
+    if _image_jobs is None:
+        _image_jobs = ImageJobManager(create_image_backend(IMAGE_BACKEND), ImageCache(IMAGE_CACHE_DIR),
+                                      IMAGE_MAX_CONCURRENT, IMAGE_QUEUE_SIZE, on_done=_image_job_done)
+    return _image_jobs
+
+def generate_image(prompt: str, params=None):
+    jobs = get_image_jobs()
+    problem = jobs.backend.available()
+    if problem is not True:
+        speak(problem)
+        gui.log(f"Image backend '{jobs.backend.name}' unavailable.", "ERROR")
+        return
+    status, result = jobs.submit(prompt, params)
+    if status == "cached":
+        gui.log(f"Image for '{prompt}' served from cache: {result}", "SYSTEM")
+        _open_image(result)
+        speak("I already had that image, so I've opened it for you.")
+    elif status == "joined":
+        speak("That image is already being generated. I'll open it when it's ready.")
+    elif status == "full":
+        speak("I'm already working on too many images. Please wait or cancel one.")
+    else:
+        gui.log(f"Generating image for prompt: {prompt}", "SYSTEM")
+        speak(f"Generating an image of {prompt}. This may take a moment.")
+
+def image_status():
+    jobs = get_image_jobs().active()
+    if not jobs:
+        speak("No images are being generated right now.")
+        return
+    running = [j for j in jobs if j.state == "running"]
+    queued = [j for j in jobs if j.state == "queued"]
+    parts = []
+    if running:
+        parts.append(f"{len(running)} generating, including {running[0].prompt}")
+    if queued:
+        parts.append(f"{len(queued)} waiting")
+    speak("Images: " + ", ".join(parts) + "." if parts else "Images are being cancelled.")
+
+def cancel_image(all_jobs=False):
+    cancelled = get_image_jobs().cancel(all_jobs)
+    if not cancelled:
+        speak("There are no image jobs to cancel.")
+    elif len(cancelled) == 1:
+        speak(f"Cancelled the image of {cancelled[0].prompt}.")
+    else:
+        speak(f"Cancelled {len(cancelled)} image jobs.")
 
 # -------------------------
 # New email feature
 # -------------------------
+class EmailOutbox:
+    """
+    Durable outbox. Each queued message is journaled as a JSON file before it is
+    acknowledged, so nothing is lost on a crash; a single worker sends them over
+    one authenticated SMTP connection that is kept open while there is work and
+    closed after idle_close seconds. Transient failures (disconnects, 4xx
+    replies) are retried with exponential backoff; permanent ones move the
+    journal entry to failed/.
+    """
+    def __init__(self, root, host, port, security="ssl", user=None, password=None,
+                 max_attempts=6, backoff=2.0, max_backoff=300.0, idle_close=60.0,
+                 on_sent=None, on_failed=None):
+        self.root = root
+        self.host, self.port, self.security = host, port, security
+        self.user, self.password = user, password
+        self.max_attempts = max_attempts
+        self.backoff, self.max_backoff = backoff, max_backoff
+        self.idle_close = idle_close
+        self.on_sent, self.on_failed = on_sent, on_failed
+        self._heap = []
+        self._ids = set()  # message ids currently in the heap
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._smtp = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "retries": 0, "connections": 0,
+                      "latency_total": 0.0, "send_total": 0.0, "first_sent": None, "last_sent": None}
+
+    def _path(self, mid, sub=""):
+        return os.path.join(self.root, sub, mid + ".json")
+
+    def _journal(self, msg):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._path(msg["id"]) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(msg, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(msg["id"]))
+
+    def _push(self, msg):
+        if msg["id"] in self._ids:
+            return False
+        self._ids.add(msg["id"])
+        heapq.heappush(self._heap, (msg["next_attempt"], next(self._seq), msg))
+        self._cond.notify()
+        return True
+
+    def start(self):
+        """Re-queue anything journaled by a previous run and start the sender."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            recovered = 0
+            if os.path.isdir(self.root):
+                for name in sorted(os.listdir(self.root)):
+                    if not name.endswith(".json"):
+                        continue
+                    try:
+                        with open(os.path.join(self.root, name), "r", encoding="utf-8") as f:
+                            msg = json.load(f)
+                    except (OSError, ValueError):
+                        continue
+                    with self._cond:
+                        recovered += self._push(msg)
+            if recovered:
+                _log_system(f"Email outbox: {recovered} message(s) recovered from the journal.")
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, recipient, subject, body):
+        now = time.time()
+        msg = {"id": f"{int(now * 1000)}-{hashlib.sha1(os.urandom(8)).hexdigest()[:8]}",
+               "to": recipient, "subject": subject, "body": body,
+               "created": now, "attempts": 0, "next_attempt": now, "last_error": None}
+        self._journal(msg)
+        with self._cond:
+            self.stats["queued"] += 1
+            self._push(msg)
+        return msg["id"]
+
+    def pending(self):
+        with self._cond:
+            return [entry[2] for entry in sorted(self._heap)]
+
+    def _connect(self):
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=30)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.security == "starttls":
+                smtp.starttls()
+        if self.user and self.password:
+            smtp.login(self.user, self.password)
+        self.stats["connections"] += 1
+        return smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _deliver(self, msg):
+        email = EmailMessage()
+        email.set_content(msg["body"])
+        email["Subject"] = msg["subject"]
+        email["From"] = self.user
+        email["To"] = msg["to"]
+        for attempt in range(2):  # a pooled connection may have been dropped by the server
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(email)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                if attempt:
+                    raise
+
+    @staticmethod
+    def _is_transient(error):
+        if isinstance(error, smtplib.SMTPAuthenticationError):
+            return False
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return all(400 <= code < 500 for code, _ in error.recipients.values())
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        return isinstance(error, (smtplib.SMTPException, OSError))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    timeout = self._heap[0][0] - time.time() if self._heap else self.idle_close
+                    if not self._cond.wait(timeout) and not self._heap:
+                        self._close()  # idle: don't hold the server connection open
+                _, _, msg = heapq.heappop(self._heap)
+                self._ids.discard(msg["id"])
+            t0 = time.time()
+            try:
+                self._deliver(msg)
+            except Exception as e:
+                self._close()
+                self._retry_or_fail(msg, e)
+                continue
+            done = time.time()
+            try:
+                os.remove(self._path(msg["id"]))
+            except OSError:
+                pass
+            with self._cond:
+                self.stats["sent"] += 1
+                self.stats["send_total"] += done - t0
+                self.stats["latency_total"] += done - msg["created"]
+                self.stats["first_sent"] = self.stats["first_sent"] or done
+                self.stats["last_sent"] = done
+            if self.on_sent:
+                self.on_sent(msg)
+
+    def _retry_or_fail(self, msg, error):
+        msg["attempts"] += 1
+        msg["last_error"] = str(error)
+        if self._is_transient(error) and msg["attempts"] < self.max_attempts:
+            delay = min(self.max_backoff, self.backoff * 2 ** (msg["attempts"] - 1))
+            msg["next_attempt"] = time.time() + delay
+            self._journal(msg)
+            with self._cond:
+                self.stats["retries"] += 1
+                self._push(msg)
+            _log_system(f"Email to {msg['to']} failed ({error}); retrying in {delay:.0f}s.")
+            return
+        os.makedirs(os.path.join(self.root, "failed"), exist_ok=True)
+        try:
+            os.replace(self._path(msg["id"]), self._path(msg["id"], "failed"))
+        except OSError:
+            pass
+        with self._cond:
+            self.stats["failed"] += 1
+        if self.on_failed:
+            self.on_failed(msg, error)
+
+    def report(self):
+        st = self.stats
+        sent = st["sent"]
+        span = (st["last_sent"] - st["first_sent"]) if sent > 1 else 0
+        rate = f"{(sent - 1) / span:.1f}/s" if span > 0 else "n/a"
+        if not sent:
+            return (f"queued {st['queued']}, sent 0, failed {st['failed']}, "
+                    f"retries {st['retries']}, pending {len(self._heap)}")
+        return (f"queued {st['queued']}, sent {sent}, failed {st['failed']}, retries {st['retries']}, "
+                f"pending {len(self._heap)}, connections {st['connections']}, "
+                f"avg delivery {st['latency_total'] / sent * 1000:.0f} ms, "
+                f"avg SMTP send {st['send_total'] / sent * 1000:.0f} ms, throughput {rate}")
+
+def _email_sent(msg):
+    gui.log(f"Email sent successfully to {msg['to']}.", "SYSTEM")
+    speak(f"Email sent successfully to {msg['to']}.")
+
+def _email_failed(msg, error):
+    gui.log(f"Failed to send email to {msg['to']} after {msg['attempts']} attempt(s): {error}", "ERROR")
+    speak(f"I couldn't send the email to {msg['to']}.")
+
+outbox = EmailOutbox(EMAIL_OUTBOX_DIR, SMTP_HOST, SMTP_PORT, SMTP_SECURITY, EMAIL_ADDRESS, EMAIL_APP_PASSWORD,
+                     max_attempts=EMAIL_MAX_ATTEMPTS, on_sent=_email_sent, on_failed=_email_failed)
+
+def email_configured():
+    return bool(EMAIL_ADDRESS and (EMAIL_APP_PASSWORD or SMTP_SECURITY == "none"))
+
 def send_email_task(recipient, subject, body):
-    if not EMAIL_ADDRESS or not EMAIL_APP_PASSWORD:
+    if not email_configured():
         speak("Email feature is not configured. Please set up your email address and app password in the environment variables.")
         gui.log("Email not configured. Check environment variables.", "ERROR")
         return False
-    
-    try:
-        msg = EmailMessage()
-        msg.set_content(body)
-        msg['Subject'] = subject
-        msg['From'] = EMAIL_ADDRESS
-        msg['To'] = recipient
-
-        gui.log("Attempting to send email...", "SYSTEM")
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.login(EMAIL_ADDRESS, EMAIL_APP_PASSWORD)
-            smtp.send_message(msg)
-        
-        gui.log(f"Email sent successfully to {recipient}.", "SYSTEM")
-        speak(f"Email sent successfully to {recipient}.")
+    if headless_skip(f"sending email to {recipient}"):
         return True
-    except Exception as e:
-        gui.log(f"Failed to send email: {e}", "ERROR")
+    try:
+        outbox.enqueue(recipient, subject, body)
+    except OSError as e:
+        gui.log(f"Failed to queue email: {e}", "ERROR")
         speak("I encountered an error while trying to send the email.")
         return False
+    outbox.start()
+    gui.log(f"Email to {recipient} queued for sending.", "SYSTEM")
+    return True
+
+def pending_emails():
+    pending = outbox.pending()
+    gui.log(f"Email outbox: {outbox.report()}", "SYSTEM")
+    if not pending:
+        speak("There are no emails waiting to be sent.")
+        return
+    retrying = [m for m in pending if m["attempts"]]
+    text = f"{len(pending)} email{'s' if len(pending) != 1 else ''} waiting to be sent"
+    if retrying:
+        wait = max(0, int(retrying[0]["next_attempt"] - time.time()))
+        text += f", {len(retrying)} retrying, next attempt in {wait} seconds"
+    speak(text + ".")
 
 # -------------------------
 # WhatsApp features (Desktop App Automation)
@@ -592,10 +3473,12 @@ def send_whatsapp_message_desktop(contact_name: str, message: str):
     This function relies on screen coordinates and UI elements.
     It may fail if the WhatsApp app UI or screen resolution changes.
     """
-    if pyautogui is None:
+    if not pyautogui:
         speak("WhatsApp automation is not available. Please install the 'pyautogui' library.")
         gui.log("PyAutoGUI not found.", "ERROR")
         return
+    if headless_skip(f"WhatsApp message to {contact_name}"):
+        return
     
     try:
         gui.log("Starting WhatsApp automation...", "SYSTEM")
@@ -643,18 +3526,225 @@ def tell_joke():
     joke = random.choice(JOKES)
     speak(joke)
 
+class NotesStore:
+    """
+    Notes in SQLite with an FTS5 index over their text (LIKE scans if this
+    SQLite lacks FTS5). add() only buffers: a writer thread commits everything
+    that arrived within flush_interval in one transaction, and readers flush
+    first so they always see their own writes. The legacy text file is imported
+    once, the first time the database is opened.
+    """
+    NOTE_LINE = re.compile(r"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] ?(.*)$")
+
+    def __init__(self, path, legacy_file=None, flush_interval=0.2, batch_size=256):
+        self.path = path
+        self.legacy_file = legacy_file
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fts = False
+        self._conn = None
+        self._db_lock = threading.RLock()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._writer = None
+        self.stats = {"added": 0, "commits": 0, "imported": 0}
+
+    def _db(self):
+        with self._db_lock:
+            if self._conn is None:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, created REAL NOT NULL, text TEXT NOT NULL);
+                    CREATE INDEX IF NOT EXISTS notes_created ON notes(created);
+                    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                """)
+                try:
+                    conn.executescript("""
+                        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(text, content='notes', content_rowid='id');
+                        CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+                            INSERT INTO notes_fts(rowid, text) VALUES (new.id, new.text);
+                        END;
+                        CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+                            INSERT INTO notes_fts(notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                        END;
+                    """)
+                    self.fts = True
+                except sqlite3.OperationalError:
+                    _log_system("SQLite FTS5 is unavailable; note searches will scan.")
+                self._conn = conn
+                self._import_legacy()
+            return self._conn
+
+    def _import_legacy(self):
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return
+        rows = []
+        if self.legacy_file and os.path.exists(self.legacy_file):
+            with open(self.legacy_file, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    line = line.rstrip("\n")
+                    m = self.NOTE_LINE.match(line)
+                    if m:
+                        when = datetime.datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S").timestamp()
+                        rows.append([when, m.group(2)])
+                    elif rows and line.strip():
+                        rows[-1][1] += "\n" + line  # continuation of a multi-line note
+        with conn:
+            conn.executemany("INSERT INTO notes (created, text) VALUES (?, ?)", rows)
+            conn.execute("INSERT INTO meta VALUES ('legacy_imported', ?)", (str(len(rows)),))
+        self.stats["imported"] = len(rows)
+        if rows:
+            _log_system(f"Imported {len(rows)} notes from {self.legacy_file}.")
+
+    def add(self, text, when=None):
+        with self._cond:
+            self._pending.append((when or time.time(), text))
+            self.stats["added"] += 1
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="notes-writer", daemon=True)
+                self._writer.start()
+            self._cond.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.time() + self.flush_interval
+                while len(self._pending) < self.batch_size and time.time() < deadline:
+                    self._cond.wait(deadline - time.time())
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                _log_system(f"Failed to write notes: {e}")
+                time.sleep(1.0)
+
+    def flush(self):
+        """Commit every buffered note in a single transaction."""
+        with self._db_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            conn = self._db()
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO notes (created, text) VALUES (?, ?)", batch)
+            except sqlite3.Error:
+                with self._cond:
+                    self._pending[:0] = batch
+                raise
+            self.stats["commits"] += 1
+            return len(batch)
+
+    def _query(self, sql, args):
+        with self._db_lock:
+            self.flush()
+            return self._db().execute(sql, args).fetchall()
+
+    def search(self, query, limit=5):
+        """Best matching (created, text) pairs; every word must occur, the last as a prefix."""
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        self._db()
+        if self.fts:
+            expr = " ".join(f'"{w}"' for w in words) + "*"
+            return self._query("SELECT n.created, n.text FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid "
+                               "WHERE notes_fts MATCH ? ORDER BY rank LIMIT ?", (expr, limit))
+        where = " AND ".join("text LIKE ?" for _ in words)
+        return self._query(f"SELECT created, text FROM notes WHERE {where} ORDER BY created DESC LIMIT ?",
+                           [f"%{w}%" for w in words] + [limit])
+
+    def recent(self, n=3):
+        return self._query("SELECT created, text FROM notes ORDER BY created DESC, id DESC LIMIT ?", (n,))
+
+    def between(self, start, end, limit=20):
+        """Notes created in [start, end), oldest first; start/end are datetimes."""
+        return self._query("SELECT created, text FROM notes WHERE created >= ? AND created < ? "
+                           "ORDER BY created LIMIT ?", (start.timestamp(), end.timestamp(), limit))
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM notes", ())[0][0]
+
+notes = NotesStore(NOTES_DB, NOTES_FILE)
+
 def save_note(text):
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        with open(NOTES_FILE, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {text}\n")
+        notes.add(text)
         gui.log("Note saved.", "SYSTEM")
         speak("Note saved.")
     except Exception as e:
         gui.log(f"Failed to save note: {e}", "ERROR")
         speak("I couldn't save the note.")
 
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "twenty": 20}
+
+def _speak_notes(rows, empty):
+    if not rows:
+        speak(empty)
+        return
+    for created, text in rows:
+        when = datetime.datetime.fromtimestamp(created)
+        speak(f"{when.strftime('%B %d at %I:%M %p')}: {text}")
+
+def search_notes(query):
+    query = re.sub(r"^(for|about)\s+", "", query.strip())
+    if not query:
+        speak("What should I search your notes for?")
+        return
+    try:
+        rows = notes.search(query)
+    except sqlite3.Error as e:
+        gui.log(f"Note search failed: {e}", "ERROR")
+        speak("I couldn't search your notes.")
+        return
+    if rows:
+        speak(f"I found {len(rows)} note{'s' if len(rows) != 1 else ''} about {query}.")
+    _speak_notes(rows, f"I couldn't find any notes about {query}.")
+
+def _day_start(dt):
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def read_notes(command):
+    """'read my last 5 notes', 'notes from yesterday', 'notes since monday', 'notes between X and Y'."""
+    try:
+        between = re.search(r"\bbetween (.+) and (.+)$", command)
+        since = re.search(r"\bsince (.+)$", command)
+        on_day = re.search(r"\b(?:from|on) (.+)$", command)
+        if between or since or on_day:
+            settings = {"PREFER_DATES_FROM": "past"}
+            if between:
+                start = dateparser.parse(between.group(1), settings=settings)
+                end = dateparser.parse(between.group(2), settings=settings)
+                if start and end:
+                    start, end = _day_start(start), _day_start(end) + datetime.timedelta(days=1)
+            elif since:
+                start, end = dateparser.parse(since.group(1), settings=settings), datetime.datetime.now() + datetime.timedelta(seconds=1)
+            else:
+                start = dateparser.parse(on_day.group(1), settings=settings)
+                if start:
+                    start = _day_start(start)
+                    end = start + datetime.timedelta(days=1)
+            if not start or not end:
+                speak("I couldn't understand that date range.")
+                return
+            _speak_notes(notes.between(start, end), "You have no notes from then.")
+            return
+        count = re.search(r"\b(\d+)\b", command)
+        n = int(count.group(1)) if count else next((v for k, v in NUMBER_WORDS.items() if re.search(rf"\b{k}\b", command)), 3)
+        _speak_notes(notes.recent(min(n, 20)), "You don't have any notes yet.")
+    except sqlite3.Error as e:
+        gui.log(f"Reading notes failed: {e}", "ERROR")
+        speak("I couldn't read your notes.")
+
 def take_screenshot():
+    if headless_skip("screenshot"):
+        return
     try:
         filename = f"Screenshot_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
         path = os.path.join(SCREENSHOT_DIR, filename)
@@ -667,7 +3757,7 @@ def take_screenshot():
         speak("I couldn't take a screenshot.")
 
 def read_clipboard():
-    if pyperclip is None:
+    if not pyperclip:
         speak("Clipboard support is not available. Install the pyperclip package.")
         return
     try:
@@ -695,50 +3785,254 @@ def open_website_shortcut(name):
     }
     url = mapping.get(name) or (name if name.startswith("http") else f"https://{name}.com")
     gui.log(f"Opening website: {url}", "SYSTEM")
-    webbrowser.open(url)
+    if not headless_skip(f"opening {url}"):
+        webbrowser.open(url)
     speak(f"Opening {name}")
 
+class SystemMonitor:
+    """
+    Background sampler of CPU, RAM, battery and disk into fixed-size NumPy ring
+    buffers, plus the top memory/CPU processes every MONITOR_PROC_EVERY samples.
+    Empty slots keep timestamp 0, so a time-window mask selects only real samples
+    and aggregations never need the ring in chronological order.
+    """
+    FIELDS = ("cpu", "ram", "battery", "plugged", "disk", "disk_io")
+
+    def __init__(self, interval=2.0, history=3600, proc_every=5, top_n=8):
+        self.interval = interval
+        self.size = max(2, int(history / interval))
+        self.proc_every = proc_every
+        self.top_n = top_n
+        self.proc_size = max(1, self.size // proc_every)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._next = 0
+        self._proc_next = 0
+        self._names = {}
+        self._last_io = None
+        self.stats = {"samples": 0, "proc_scans": 0, "sample_time": 0.0, "proc_time": 0.0}
+
+    def _allocate(self):
+        self.times = np.zeros(self.size)
+        self.data = {f: np.full(self.size, np.nan, dtype=np.float32) for f in self.FIELDS}
+        self.proc_times = np.zeros(self.proc_size)
+        self.proc = {kind: (np.zeros((self.proc_size, self.top_n), dtype=np.int64),
+                            np.zeros((self.proc_size, self.top_n), dtype=np.float64))
+                     for kind in ("memory", "cpu")}
+
+    def start(self):
+        if not psutil:
+            return False
+        if self._thread is None:
+            self._allocate()
+            psutil.cpu_percent(interval=None)  # prime the counters; the first reading is meaningless
+            self._thread = threading.Thread(target=self._run, name="system-monitor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        tick = 0
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample()
+                if tick % self.proc_every == 0:
+                    self.sample_processes()
+            except Exception as e:
+                _log_system(f"System monitor error: {e}")
+            tick += 1
+
+    def sample(self):
+        t0 = time.perf_counter()
+        now = time.time()
+        values = {"cpu": psutil.cpu_percent(interval=None), "ram": psutil.virtual_memory().percent}
+        try:
+            battery = psutil.sensors_battery()
+        except Exception:
+            battery = None
+        if battery:
+            values["battery"] = battery.percent
+            values["plugged"] = 1.0 if battery.power_plugged else 0.0
+        try:
+            values["disk"] = psutil.disk_usage(os.path.abspath(os.sep)).percent
+            io_now = psutil.disk_io_counters()
+            if io_now is not None:
+                if self._last_io is not None:
+                    moved = (io_now.read_bytes + io_now.write_bytes) - (self._last_io[1].read_bytes + self._last_io[1].write_bytes)
+                    values["disk_io"] = max(0, moved) / max(1e-6, now - self._last_io[0])
+                self._last_io = (now, io_now)
+        except Exception:
+            pass
+        with self._lock:
+            i = self._next % self.size
+            self.times[i] = now
+            for field in self.FIELDS:
+                self.data[field][i] = values.get(field, np.nan)
+            self._next += 1
+        self.stats["samples"] += 1
+        self.stats["sample_time"] += time.perf_counter() - t0
+
+    def sample_processes(self):
+        t0 = time.perf_counter()
+        pids, rss, cpu, names = [], [], [], {}
+        for proc in psutil.process_iter(["pid", "name", "memory_info", "cpu_percent"]):
+            info = proc.info
+            if info["memory_info"] is None:
+                continue
+            pids.append(info["pid"])
+            rss.append(info["memory_info"].rss)
+            cpu.append(info["cpu_percent"] or 0.0)
+            names[info["pid"]] = info["name"] or str(info["pid"])
+        pids = np.asarray(pids, dtype=np.int64)
+        columns = {"memory": np.asarray(rss, dtype=np.float64),
+                   "cpu": np.asarray(cpu, dtype=np.float64) / (psutil.cpu_count() or 1)}
+        with self._lock:
+            j = self._proc_next % self.proc_size
+            self.proc_times[j] = time.time()
+            for kind, values in columns.items():
+                k = min(self.top_n, len(values))
+                top = np.argpartition(-values, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+                pid_ring, value_ring = self.proc[kind]
+                pid_ring[j].fill(0)
+                value_ring[j].fill(0)
+                pid_ring[j, :k] = pids[top]
+                value_ring[j, :k] = values[top]
+            self._proc_next += 1
+            self._names.update(names)
+            if len(self._names) > 4 * self.top_n * self.proc_size:
+                live = set(np.unique(np.concatenate([r[0].ravel() for r in self.proc.values()])).tolist())
+                self._names = {pid: name for pid, name in self._names.items() if pid in live}
+        self.stats["proc_scans"] += 1
+        self.stats["proc_time"] += time.perf_counter() - t0
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def latest(self, max_age=None):
+        """The newest sample as a dict (NaN fields dropped), or None if there is none fresh enough."""
+        if self._thread is None or self._next == 0:
+            return None
+        with self._lock:
+            i = (self._next - 1) % self.size
+            when = self.times[i]
+            sample = {f: float(self.data[f][i]) for f in self.FIELDS if not np.isnan(self.data[f][i])}
+        age = time.time() - when
+        if age > (max_age if max_age is not None else 3 * self.interval + 1):
+            return None
+        sample["age"] = age
+        return sample
+
+    def covered_seconds(self):
+        """How far back the kept samples reach."""
+        with self._lock:
+            if self._next == 0:
+                return 0.0
+            oldest = self.times[self._next % self.size] if self._next >= self.size else self.times[0]
+        return time.time() - oldest
+
+    def window(self, field, seconds):
+        """(mean, min, max, sample count) of a field over the last `seconds`."""
+        with self._lock:
+            values = self.data[field][self.times >= time.time() - seconds]
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return None
+        return float(values.mean()), float(values.min()), float(values.max()), int(values.size)
+
+    def top_processes(self, kind="memory", n=3, seconds=None):
+        """
+        Heaviest processes as (name, value) pairs: from the latest scan, or by
+        mean over the scans of the last `seconds`. value is bytes for memory
+        and percent of total CPU for cpu.
+        """
+        with self._lock:
+            if self._proc_next == 0:
+                return []
+            pid_ring, value_ring = self.proc[kind]
+            if seconds is None:
+                rows = [(self._proc_next - 1) % self.proc_size]
+            else:
+                rows = np.flatnonzero(self.proc_times >= time.time() - seconds)
+            pids = pid_ring[rows].ravel()
+            values = value_ring[rows].ravel()
+            names = dict(self._names)
+        keep = pids > 0
+        pids, values = pids[keep], values[keep]
+        if not pids.size:
+            return []
+        unique, inverse = np.unique(pids, return_inverse=True)
+        means = np.bincount(inverse, weights=values) / np.bincount(inverse)
+        order = np.argsort(-means)[:n]
+        return [(names.get(int(unique[k]), str(unique[k])), float(means[k])) for k in order]
+
+    def report(self):
+        st = self.stats
+        per_sample = st["sample_time"] / st["samples"] * 1000 if st["samples"] else 0.0
+        per_scan = st["proc_time"] / st["proc_scans"] * 1000 if st["proc_scans"] else 0.0
+        return (f"{st['samples']} samples ({per_sample:.2f} ms each), "
+                f"{st['proc_scans']} process scans ({per_scan:.1f} ms each), ring {self.size} slots")
+
+system_monitor = SystemMonitor(MONITOR_INTERVAL, MONITOR_HISTORY, MONITOR_PROC_EVERY, MONITOR_TOP_N)
+
+def _current_cpu():
+    sample = system_monitor.latest()
+    if sample is not None:
+        return sample["cpu"]
+    if system_monitor.started:
+        return psutil.cpu_percent(interval=None)  # before the first sample: usage since the monitor primed the counters
+    return psutil.cpu_percent(interval=0.2)  # monitor not running; a short blocking read
+
 def get_system_info():
-    if psutil is None:
+    if not psutil:
         speak("System info library is not available. Install psutil.")
         return
-    cpu = psutil.cpu_percent(interval=1)
-    mem = psutil.virtual_memory()
-    mem_percent = mem.percent
+    sample = system_monitor.latest()
+    cpu = sample["cpu"] if sample else _current_cpu()
+    mem_percent = sample["ram"] if sample else psutil.virtual_memory().percent
     speak(f"CPU usage is {int(cpu)} percent. Memory usage is {int(mem_percent)} percent.")
+    if sample and "disk" in sample:
+        speak(f"The system disk is {int(sample['disk'])} percent full.")
     try:
-        battery = psutil.sensors_battery()
+        battery = (sample["battery"], sample["plugged"]) if sample and "battery" in sample else None
+        if battery is None and not sample:
+            raw = psutil.sensors_battery()
+            battery = (raw.percent, raw.power_plugged) if raw else None
         if battery:
-            plugged = "charging" if battery.power_plugged else "not charging"
-            speak(f"Battery at {int(battery.percent)} percent and {plugged}.")
+            plugged = "charging" if battery[1] else "not charging"
+            speak(f"Battery at {int(battery[0])} percent and {plugged}.")
         else:
             gui.log("No battery info available.", "SYSTEM")
     except Exception:
         pass
 
 def get_cpu_usage():
-    if psutil is None:
+    if not psutil:
         speak("Install psutil for CPU info.")
         return
-    cpu = psutil.cpu_percent(interval=1)
-    speak(f"CPU usage is {int(cpu)} percent.")
+    speak(f"CPU usage is {int(_current_cpu())} percent.")
 
 def get_ram_usage():
-    if psutil is None:
+    if not psutil:
         speak("Install psutil for RAM info.")
         return
-    mem = psutil.virtual_memory()
-    speak(f"Memory usage is {int(mem.percent)} percent.")
+    sample = system_monitor.latest()
+    percent = sample["ram"] if sample else psutil.virtual_memory().percent
+    speak(f"Memory usage is {int(percent)} percent.")
 
 def get_battery_status():
-    if psutil is None:
+    if not psutil:
         speak("Install psutil for battery info.")
         return
     try:
-        battery = psutil.sensors_battery()
+        sample = system_monitor.latest()
+        if sample is not None:
+            battery = (sample["battery"], sample["plugged"]) if "battery" in sample else None
+        else:
+            raw = psutil.sensors_battery()
+            battery = (raw.percent, raw.power_plugged) if raw else None
         if battery:
-            plugged = "charging" if battery.power_plugged else "not charging"
-            speak(f"Battery at {int(battery.percent)} percent and {plugged}.")
+            plugged = "charging" if battery[1] else "not charging"
+            speak(f"Battery at {int(battery[0])} percent and {plugged}.")
         else:
             gui.log("No battery info available.", "SYSTEM")
             speak("I couldn't get the battery information.")
@@ -746,22 +4040,295 @@ def get_battery_status():
         gui.log(f"Battery status error: {e}", "ERROR")
         speak("I couldn't get the battery information.")
 
+def _window_seconds(command, default=600):
+    """'last 10 minutes', 'past hour', 'last 30 seconds' -> seconds, at most MONITOR_HISTORY."""
+    m = re.search(r"\b(?:(\d+|an?|one|two|five|ten|fifteen|thirty)\s*|(?:last|past|the)\s+)(second|minute|hour)s?\b",
+                  command)
+    if not m:
+        return default if default is None else min(default, MONITOR_HISTORY)
+    if m.group(1) is None:
+        amount = 1  # 'past hour'
+    else:
+        amount = {"a": 1, "an": 1, "one": 1, "two": 2, "five": 5, "ten": 10, "fifteen": 15, "thirty": 30}.get(m.group(1))
+        amount = amount or int(m.group(1))
+    return min(amount * {"second": 1, "minute": 60, "hour": 3600}[m.group(2)], MONITOR_HISTORY)
+
+def _describe_window(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 120 and seconds % 60:
+        seconds = int(round(seconds / 60)) * 60
+    if seconds % 3600 == 0:
+        hours = seconds // 3600
+        return "hour" if hours == 1 else f"{hours} hours"
+    if seconds % 60 == 0:
+        minutes = seconds // 60
+        return "minute" if minutes == 1 else f"{minutes} minutes"
+    return "second" if seconds == 1 else f"{seconds} seconds"
+
+def usage_average(command):
+    """'average CPU over the last 10 minutes', 'peak memory in the past hour'."""
+    if not psutil:
+        speak("Install psutil for system history.")
+        return
+    field, label = ("ram", "memory usage") if ("memory" in command or "ram" in command) else \
+                   ("battery", "battery level") if "battery" in command else ("cpu", "CPU usage")
+    seconds = _window_seconds(command)
+    result = system_monitor.window(field, seconds) if system_monitor.latest(max_age=seconds) else None
+    if result is None:
+        speak(f"I don't have any {label} history yet.")
+        return
+    mean, low, high, count = result
+    covered = system_monitor.covered_seconds()
+    if covered >= seconds - system_monitor.interval:
+        lead = f"Over the last {_describe_window(seconds)}"
+    else:
+        lead = f"Over the last {_describe_window(covered)}, all the history I have so far"
+    speak(f"{lead}, {label} averaged {mean:.0f} percent, ranging from {low:.0f} to {high:.0f} percent.")
+    gui.log(f"{label} window {seconds}s: {count} samples; monitor: {system_monitor.report()}", "SYSTEM")
+
+def top_consumers(command):
+    """'what's using the most memory', 'what is using the most cpu over the last 10 minutes'."""
+    if not psutil:
+        speak("Install psutil for process information.")
+        return
+    kind = "cpu" if ("cpu" in command or "processor" in command) else "memory"
+    seconds = _window_seconds(command, default=None) if re.search(r"\b(last|past)\b", command) else None
+    top = system_monitor.top_processes(kind, n=3, seconds=seconds)
+    if not top:
+        speak("I haven't sampled the running processes yet. Ask me again in a few seconds.")
+        return
+    if kind == "memory":
+        parts = [f"{name} with {value / (1024 ** 3):.1f} gigabytes" if value >= 1024 ** 3
+                 else f"{name} with {value / (1024 ** 2):.0f} megabytes" for name, value in top]
+    else:
+        parts = [f"{name} at {value:.0f} percent" for name, value in top]
+    speak(f"The most {'CPU' if kind == 'cpu' else 'memory'} is used by " + ", then ".join(parts) + ".")
+
+HttpResult = collections.namedtuple("HttpResult", "status data cached age")
+
+class CachedHttpClient:
+    """
+    Shared HTTP layer for web lookups: one pooled requests.Session (keep-alive),
+    a per-endpoint TTL cache, conditional revalidation with ETag/Last-Modified
+    once an entry goes stale, and retries with exponential backoff for
+    connection errors, 429 and 5xx.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, ttls, retries=3, backoff=0.5, pool_size=8, max_entries=256):
+        self.ttls = ttls
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.max_entries = max_entries
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = collections.defaultdict(lambda: collections.Counter())
+
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:  # another thread may have built it meanwhile
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size,
+                                                            pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def _request(self, endpoint, url, params, headers, timeout):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session().get(url, params=params, headers=headers, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                response = None
+            if response is not None and (response.status_code not in self.RETRY_STATUSES or attempt == self.retries):
+                return response
+            delay = self.backoff * (2 ** attempt)
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = min(int(retry_after), 30)
+            self.stats[endpoint]["retries"] += 1
+            time.sleep(delay)
+
+    def get_json(self, endpoint, url, params=None, timeout=8, max_age=None):
+        """
+        GET url and decode JSON, answering from the cache while the endpoint's TTL
+        allows. max_age tightens the TTL for this call (0 forces revalidation).
+        """
+        key = (endpoint, url, tuple(sorted((params or {}).items())))
+        ttl = self.ttls.get(endpoint, 0)
+        fresh_for = ttl if max_age is None else min(ttl, max_age)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                if now - entry["time"] < fresh_for:
+                    self.stats[endpoint]["hits"] += 1
+                    return HttpResult(200, entry["data"], True, now - entry["time"])
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = self._request(endpoint, url, params, headers, timeout)
+        except Exception:
+            self.stats[endpoint]["errors"] += 1
+            raise
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                entry["time"] = now
+            self.stats[endpoint]["revalidated"] += 1
+            return HttpResult(200, entry["data"], True, 0.0)
+        self.stats[endpoint]["misses"] += 1
+        data = response.json()
+        if response.status_code == 200 and ttl:
+            with self._lock:
+                self._cache[key] = {
+                    "time": now, "data": data,
+                    "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+                }
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return HttpResult(response.status_code, data, False, 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def report(self):
+        return [f"{endpoint}: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+                for endpoint, counts in self.stats.items()]
+
+http = CachedHttpClient(HTTP_CACHE_TTLS)
+
+def fetch_headlines(max_age=None):
+    """Top headline titles from NewsAPI (may be served from cache)."""
+    result = http.get_json("news", f"{NEWS_API_BASE_URL}/v2/top-headlines",
+                           params={"country": "us", "apiKey": NEWS_API_KEY}, timeout=10, max_age=max_age)
+    return [article["title"] for article in result.data.get("articles", [])]
+
+def fetch_weather(city: str, max_age=None):
+    """Weather dict for a city, or None if OpenWeather doesn't know it."""
+    result = http.get_json("weather", f"{OPENWEATHER_BASE_URL}/data/2.5/weather",
+                           params={"q": city, "appid": OPENWEATHER_API_KEY, "units": "metric"}, max_age=max_age)
+    if result.status != 200:
+        return None
+    data = result.data
+    return {"description": data["weather"][0]["description"], "temp": data["main"]["temp"],
+            "humidity": data["main"]["humidity"]}
+
+class Prefetcher:
+    """
+    Keeps answers for common lookups warm: refreshes every registered job on a
+    fixed interval, and again (for entries older than poke_min_age) whenever
+    poke() signals wake-word activity. Commands read the warm value with its age.
+    """
+    def __init__(self, interval, poke_min_age=120):
+        self.interval = interval
+        self.poke_min_age = poke_min_age
+        self._jobs = {}
+        self._warm = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, key, fn):
+        self._jobs[key] = fn
+
+    def tracks(self, key):
+        return key in self._jobs
+
+    def start(self):
+        if self._thread is None and self._jobs:
+            self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+            self._thread.start()
+
+    def poke(self):
+        self._wake.set()
+
+    def put(self, key, value):
+        with self._lock:
+            self._warm[key] = (time.time(), value)
+
+    def get(self, key, max_age):
+        """Return (value, age_seconds) if warm data no older than max_age exists, else None."""
+        with self._lock:
+            entry = self._warm.get(key)
+        if entry is None:
+            return None
+        age = time.time() - entry[0]
+        return (entry[1], age) if age <= max_age else None
+
+    def refresh(self, min_age=0):
+        for key, fn in list(self._jobs.items()):
+            with self._lock:
+                entry = self._warm.get(key)
+            if entry is not None and time.time() - entry[0] < min_age:
+                continue
+            try:
+                value = fn()
+                if value:
+                    self.put(key, value)
+            except Exception as e:
+                _log_system(f"Prefetch of {key} failed: {e}")
+
+    def _run(self):
+        min_age = 0
+        while True:
+            self.refresh(min_age)
+            poked = self._wake.wait(self.interval)
+            self._wake.clear()
+            min_age = self.poke_min_age if poked else 0
+
+prefetcher = Prefetcher(PREFETCH_INTERVAL)
+
+def _weather_key(city):
+    return "weather:" + " ".join(city.lower().split())
+
+def register_prefetch_jobs():
+    if not requests:
+        return False
+    if NEWS_API_KEY:
+        prefetcher.add("news", lambda: fetch_headlines(max_age=0))
+    if OPENWEATHER_API_KEY:
+        for city in FAVOURITE_CITIES:
+            prefetcher.add(_weather_key(city), lambda city=city: fetch_weather(city, max_age=0))
+    prefetcher.start()
+
+def _describe_age(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "just now"
+    return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
+
 def get_news_headlines():
     if not NEWS_API_KEY:
         speak("News feature is not configured. Please add your News API key.")
         return
-    if requests is None:
+    if not requests:
         speak("Please install the requests package for news queries.")
         return
-    url = f"https://newsapi.org/v2/top-headlines?country=us&apiKey={NEWS_API_KEY}"
+    warm = prefetcher.get("news", PREFETCH_MAX_AGE)
     try:
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        articles = data.get("articles", [])
-        if articles:
-            speak("Here are the top headlines.")
-            for article in articles[:3]:
-                speak(article["title"])
+        if warm:
+            titles, age = warm
+        else:
+            titles, age = fetch_headlines(), 0
+            if titles:
+                prefetcher.put("news", titles)
+        if titles:
+            speak("Here are the top headlines." if age < 60 else f"Here are the top headlines, updated {_describe_age(age)}.")
+            for title in titles[:3]:
+                speak(title)
         else:
             speak("I couldn't fetch the news right now.")
     except Exception as e:
@@ -772,21 +4339,23 @@ def get_weather_for(city: str):
     if not OPENWEATHER_API_KEY:
         speak("Weather feature is not configured. Set the OpenWeather API key in the environment.")
         return
-    if requests is None:
+    if not requests:
         speak("Please install the requests package for weather queries.")
         return
-    city_q = urllib.parse.quote_plus(city)
-    url = f"https://api.openweathermap.org/data/2.5/weather?q={city_q}&appid={OPENWEATHER_API_KEY}&units=metric"
+    warm = prefetcher.get(_weather_key(city), PREFETCH_MAX_AGE)
     try:
-        r = requests.get(url, timeout=8)
-        if r.status_code != 200:
-            speak("I couldn't fetch weather for that location.")
-            return
-        data = r.json()
-        desc = data["weather"][0]["description"]
-        temp = data["main"]["temp"]
-        hum = data["main"]["humidity"]
-        speak(f"The weather in {city} is {desc} with temperature {int(temp)} degrees Celsius and humidity {hum} percent.")
+        if warm:
+            weather, age = warm
+        else:
+            weather, age = fetch_weather(city), 0
+            if weather is None:
+                speak("I couldn't fetch weather for that location.")
+                return
+            if prefetcher.tracks(_weather_key(city)):
+                prefetcher.put(_weather_key(city), weather)
+        suffix = f" as of {_describe_age(age)}" if age >= 60 else ""
+        speak(f"The weather in {city} is {weather['description']} with temperature {int(weather['temp'])} "
+              f"degrees Celsius and humidity {weather['humidity']} percent{suffix}.")
     except Exception as e:
         gui.log(f"Weather error: {e}", "ERROR")
         speak("I couldn't get the weather right now.")
@@ -794,70 +4363,211 @@ def get_weather_for(city: str):
 # -------------------------
 # Wikipedia search
 # -------------------------
-def wiki_summary(query: str):
-    if wikipedia is None:
-        speak("Wikipedia support not available. Install the wikipedia package.")
-        return
+class WikiCache:
+    """
+    SQLite cache of Wikipedia answers. `topics` maps a normalized spoken topic to
+    the resolved page title; `pages` holds one row per title (a 2-sentence
+    summary, or the options of a disambiguation page) so different phrasings of
+    the same subject share an entry. Rows expire after ttl seconds and the least
+    recently used pages are evicted beyond max_entries.
+    """
+    def __init__(self, path, max_entries=500, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    title TEXT PRIMARY KEY, kind TEXT NOT NULL, body TEXT NOT NULL,
+                    created REAL NOT NULL, accessed REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS pages_accessed ON pages(accessed);
+                CREATE TABLE IF NOT EXISTS topics (
+                    topic TEXT PRIMARY KEY, title TEXT NOT NULL);
+            """)
+        return self._conn
+
+    @staticmethod
+    def normalize(topic):
+        return " ".join(re.sub(r"[^\w\s]", " ", topic.lower()).split())
+
+    def lookup(self, topic=None, title=None):
+        """Fresh (kind, body) for a topic or a resolved title, or None."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            if title is None:
+                row = db.execute("SELECT title FROM topics WHERE topic = ?", (self.normalize(topic),)).fetchone()
+                if row is None:
+                    self.stats["misses"] += 1
+                    return None
+                title = row[0]
+            row = db.execute("SELECT kind, body, created FROM pages WHERE title = ?", (title,)).fetchone()
+            if row is None or now - row[2] > self.ttl:
+                if topic is not None:
+                    self.stats["misses"] += 1
+                return None
+            db.execute("UPDATE pages SET accessed = ? WHERE title = ?", (now, title))
+            db.commit()
+            self.stats["hits"] += 1
+            return row[0], row[1]
+
+    def store(self, topic, title, kind, body):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", (title, kind, body, now, now))
+            db.execute("INSERT OR REPLACE INTO topics VALUES (?, ?)", (self.normalize(topic), title))
+            self._evict(db)
+            db.commit()
+
+    def link(self, topic, title):
+        """Point another phrasing at an already cached title."""
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO topics VALUES (?, ?)", (self.normalize(topic), title))
+            db.commit()
+
+    def _evict(self, db):
+        excess = db.execute("SELECT COUNT(*) FROM pages").fetchone()[0] - self.max_entries
+        if excess > 0:
+            db.execute("DELETE FROM pages WHERE title IN "
+                       "(SELECT title FROM pages ORDER BY accessed LIMIT ?)", (excess,))
+            db.execute("DELETE FROM topics WHERE title NOT IN (SELECT title FROM pages)")
+            self.stats["evictions"] += excess
+
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM pages")
+            db.execute("DELETE FROM topics")
+            db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+wiki_cache = WikiCache(WIKI_CACHE_FILE, WIKI_CACHE_MAX_ENTRIES, WIKI_CACHE_TTL)
+
+def fetch_wiki_answer(query: str, check_cache=True):
+    """
+    Resolve a topic to (kind, body), from the cache when possible. kind is
+    "summary" or "disambiguation" (body is then a JSON list of options).
+    """
+    cached = wiki_cache.lookup(topic=query) if check_cache else None
+    if cached:
+        return cached
     try:
-        summary = wikipedia.summary(query, sentences=2, auto_suggest=True, redirect=True)
-        speak(summary)
+        page = wikipedia.page(query, auto_suggest=True, redirect=True)
     except wikipedia.exceptions.DisambiguationError as e:
-        speak("There are multiple results. Please be more specific.")
+        title = e.title or query
+        options = json.dumps(list(e.options[:5]))
+        wiki_cache.store(query, title, "disambiguation", options)
+        return "disambiguation", options
+    cached = wiki_cache.lookup(title=page.title)
+    if cached:
+        wiki_cache.link(query, page.title)
+        return cached
+    # page.summary reuses the resolved page id; wikipedia.summary() would resolve the title all over again
+    summary = " ".join(re.split(r"(?<=[.!?])\s+", page.summary.strip())[:2])
+    wiki_cache.store(query, page.title, "summary", summary)
+    return "summary", summary
+
+def _speak_wiki_answer(query: str, cached=None):
+    try:
+        kind, body = cached or fetch_wiki_answer(query, check_cache=False)
+        if kind == "disambiguation":
+            options = json.loads(body)
+            if options:
+                speak(f"There are multiple results, such as {', '.join(options[:3])}. Please be more specific.")
+            else:
+                speak("There are multiple results. Please be more specific.")
+        else:
+            speak(body)
     except Exception as e:
         gui.log(f"Wikipedia error: {e}", "ERROR")
         speak("I couldn't find that on Wikipedia.")
 
+def wiki_summary(query: str):
+    if not wikipedia:
+        speak("Wikipedia support not available. Install the wikipedia package.")
+        return
+    try:
+        cached = wiki_cache.lookup(topic=query)
+    except sqlite3.Error as e:
+        gui.log(f"Wikipedia cache error: {e}", "ERROR")
+        cached = None
+    if cached or not WIKI_FETCH_ASYNC:
+        _speak_wiki_answer(query, cached)
+        return
+    speak("Let me look that up.")
+    threading.Thread(target=_speak_wiki_answer, args=(query,), daemon=True).start()
+
 # -------------------------
 # Volume control (pycaw on Windows) with fallbacks
 # -------------------------
+_volume_interface = None
+_volume_checked = False
+
 def _get_default_volume_interface():
-    if not _pycaw_ok:
+    if not (pycaw and comtypes):
         return None
-    devices = AudioUtilities.GetSpeakers()
-    interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-    volume = comtypes.cast(interface, comtypes.POINTER(IAudioEndpointVolume))
+    devices = pycaw.AudioUtilities.GetSpeakers()
+    interface = devices.Activate(pycaw.IAudioEndpointVolume._iid_, comtypes.CLSCTX_ALL, None)
+    volume = comtypes.cast(interface, comtypes.POINTER(pycaw.IAudioEndpointVolume))
     return volume
 
-_volume_interface = None
-if _pycaw_ok:
-    try:
-        _volume_interface = _get_default_volume_interface()
-    except Exception:
-        _volume_interface = None
+def get_volume_interface():
+    global _volume_interface, _volume_checked
+    if not _volume_checked:
+        try:
+            _volume_interface = _get_default_volume_interface()
+        except Exception:
+            _volume_interface = None
+        _volume_checked = True
+    return _volume_interface
 
 def volume_up():
-    if _volume_interface is None:
+    volume = get_volume_interface()
+    if volume is None:
         speak("Volume control is not available on this system.")
         return
     try:
-        current = _volume_interface.GetMasterVolumeLevelScalar()
+        current = volume.GetMasterVolumeLevelScalar()
         new = min(1.0, current + 0.05)
-        _volume_interface.SetMasterVolumeLevelScalar(new, None)
+        volume.SetMasterVolumeLevelScalar(new, None)
         speak("Volume increased.")
     except Exception as e:
         gui.log(f"Volume up error: {e}", "ERROR")
         speak("Couldn't change volume.")
 
 def volume_down():
-    if _volume_interface is None:
+    volume = get_volume_interface()
+    if volume is None:
         speak("Volume control is not available on this system.")
         return
     try:
-        current = _volume_interface.GetMasterVolumeLevelScalar()
+        current = volume.GetMasterVolumeLevelScalar()
         new = max(0.0, current - 0.05)
-        _volume_interface.SetMasterVolumeLevelScalar(new, None)
+        volume.SetMasterVolumeLevelScalar(new, None)
         speak("Volume decreased.")
     except Exception as e:
         gui.log(f"Volume down error: {e}", "ERROR")
         speak("Couldn't change volume.")
 
 def mute_toggle():
-    if _volume_interface is None:
+    volume = get_volume_interface()
+    if volume is None:
         speak("Volume control is not available on this system.")
         return
     try:
-        muted = _volume_interface.GetMute()
-        _volume_interface.SetMute(not muted, None)
+        muted = volume.GetMute()
+        volume.SetMute(not muted, None)
         speak("Muted." if not muted else "Unmuted.")
     except Exception as e:
         gui.log(f"Mute error: {e}", "ERROR")
@@ -870,270 +4580,630 @@ def open_Youtube(query: str):
     qs = urllib.parse.quote_plus(query)
     url = f"https://www.youtube.com/results?search_query={qs}"
     gui.log(f"Opening Youtube for: {query}", "SYSTEM")
-    webbrowser.open(url)
+    if not headless_skip(f"opening {url}"):
+        webbrowser.open(url)
 
 def search_online(query: str):
     qs = urllib.parse.quote_plus(query)
     url = f"https://www.google.com/search?q={qs}"
     gui.log(f"Searching online: {query}", "SYSTEM")
-    webbrowser.open(url)
+    if not headless_skip(f"opening {url}"):
+        webbrowser.open(url)
 
-def process_command(command_text: str):
-    cmd = command_text.lower().strip()
-    doc = nlp(cmd)
-    
-    # Check for intents using a combination of keywords and spaCy
-    
-    # Weather command fix
-    if "weather in" in cmd:
-        city = cmd.split("weather in", 1)[-1].strip()
-        if city:
-            get_weather_for(city)
-        else:
-            speak("Which city would you like the weather for?")
-        return True
-    
-    # Open application command fix
-    if cmd.startswith("open ") or cmd.startswith("launch ") or cmd.startswith("start "):
-        app_name = None
-        if cmd.startswith("open "):
-            app_name = cmd[len("open "):].strip()
-        elif cmd.startswith("launch "):
-            app_name = cmd[len("launch "):].strip()
-        elif cmd.startswith("start "):
-            app_name = cmd[len("start "):].strip()
-
-        if app_name:
-            gui.log(f"Open request: {app_name}", "SYSTEM")
-            if open_application_by_name(app_name):
-                speak(f"Opening {app_name}.")
-            else:
-                speak(f"I couldn't find {app_name} locally. I'll search online.")
-                search_online(app_name)
-        else:
-            speak("Which application would you like me to open?")
-        return True
+# -------------------------
+# Intent routing
+# -------------------------
+class Intent:
+    """
+    One routable command. A command matches when any of its keywords occurs as
+    whole words, any prefix starts the command, or it equals one of the exact
+    phrases; every `also` group must additionally have at least one whole-word hit.
+    Intents with lemmas are only accepted after spaCy confirms one of them, and
+    intents with an `unless` pattern are skipped for commands it matches.
+    """
+    def __init__(self, name, handler, priority, keywords=(), prefixes=(), exact=(), also=(), lemmas=None,
+                 unless=None):
+        self.name = name
+        self.handler = handler
+        self.priority = priority
+        self.keywords = tuple(keywords)
+        self.prefixes = tuple(prefixes)
+        self.exact = tuple(exact)
+        self.also = tuple(tuple(group) for group in also)
+        self.lemmas = frozenset(lemmas) if lemmas else None
+        self.unless = re.compile(unless) if unless else None
 
-    # New image generation command
-    if "generate an image of" in cmd or "create an image of" in cmd:
-        prompt = None
-        if "generate an image of" in cmd:
-            prompt = cmd.split("generate an image of", 1)[-1].strip()
-        elif "create an image of" in cmd:
-            prompt = cmd.split("create an image of", 1)[-1].strip()
-        
-        if prompt:
-            # Run image generation in a separate thread to avoid blocking the main loop
-            threading.Thread(target=generate_image, args=(prompt,), daemon=True).start()
+class IntentMatch:
+    def __init__(self, intent, cmd, text, keyword, start, end):
+        self.intent = intent
+        self.cmd = cmd
+        self.text = text
+        self.keyword = keyword
+        self.start = start
+        self.end = end
+
+    @property
+    def rest(self):
+        """Whatever follows the matched keyword, e.g. the city in 'weather in paris'."""
+        return self.cmd[self.end:].strip()
+
+class IntentRouter:
+    """
+    Compiles every intent's phrases into one Aho-Corasick automaton, so a command
+    is matched against all intents in a single pass. The highest-priority match
+    wins; spaCy only runs when the best candidate needs lemmas.
+    Handlers return False to end the session; anything else keeps it running.
+    """
+    def __init__(self, intents, fallback):
+        self.intents = sorted(intents, key=lambda i: -i.priority)
+        self.fallback = fallback
+        self.nlp_calls = 0
+        self._compile()
+
+    def _compile(self):
+        refs = {}
+        for idx, intent in enumerate(self.intents):
+            for kw in intent.keywords:
+                refs.setdefault(kw, []).append((idx, "keyword"))
+            for kw in intent.prefixes:
+                refs.setdefault(kw, []).append((idx, "prefix"))
+            for kw in intent.exact:
+                refs.setdefault(kw, []).append((idx, "exact"))
+            for group_idx, group in enumerate(intent.also):
+                for kw in group:
+                    refs.setdefault(kw, []).append((idx, group_idx))
+        self._phrases = list(refs)
+        self._refs = [refs[p] for p in self._phrases]
+
+        goto, fail, out = [{}], [0], [[]]
+        for pid, phrase in enumerate(self._phrases):
+            node = 0
+            for ch in phrase:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    fail.append(0)
+                    out.append([])
+                    nxt = len(goto) - 1
+                    goto[node][ch] = nxt
+                node = nxt
+            out[node].append(pid)
+        pending = collections.deque(goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, child in goto[node].items():
+                pending.append(child)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                out[child] = out[child] + out[fail[child]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def _scan(self, cmd):
+        goto, fail, out, phrases = self._goto, self._fail, self._out, self._phrases
+        node = 0
+        n = len(cmd)
+        for i, ch in enumerate(cmd):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pid in out[node]:
+                start = i + 1 - len(phrases[pid])
+                end = i + 1
+                if (start == 0 or not cmd[start - 1].isalnum()) and (end == n or not cmd[end].isalnum()):
+                    yield pid, start, end
+
+    def match(self, command_text):
+        """All intents whose phrases match, best first. Lemmas are not checked here."""
+        cmd = command_text.lower().strip()
+        primary = {}
+        groups = collections.defaultdict(set)
+        for pid, start, end in self._scan(cmd):
+            for idx, role in self._refs[pid]:
+                if isinstance(role, int):
+                    groups[idx].add(role)
+                    continue
+                if role == "prefix" and start != 0:
+                    continue
+                if role == "exact" and (start != 0 or end != len(cmd)):
+                    continue
+                best = primary.get(idx)
+                if best is None or (start, -end) < (best[0], -best[1]):
+                    primary[idx] = (start, end, self._phrases[pid])
+        return [IntentMatch(self.intents[idx], cmd, command_text.strip(), kw, start, end)
+                for idx, (start, end, kw) in sorted(primary.items())
+                if len(groups[idx]) == len(self.intents[idx].also)]
+
+    def is_complete(self, command_text):
+        """True if the text is, in full, one of an intent's exact phrases (e.g. "pause")."""
+        cmd = command_text.lower().strip()
+        return any(m.keyword == cmd and cmd in m.intent.exact for m in self.match(cmd))
+
+    def resolve(self, command_text):
+        """The match that would be dispatched, or None for the fallback."""
+        doc = None
+        for m in self.match(command_text):
+            if m.intent.unless and m.intent.unless.search(m.cmd):
+                continue
+            if m.intent.lemmas:
+                if doc is None:
+                    self.nlp_calls += 1
+                    doc = nlp(m.cmd)
+                if not any(token.lemma_ in m.intent.lemmas for token in doc):
+                    continue
+            return m
+        return None
+
+    def route(self, command_text):
+        m = self.resolve(command_text)
+        if m is None:
+            return self.fallback(command_text.lower().strip()) is not False
+        return m.intent.handler(m) is not False
+
+    def describe(self):
+        return [{
+            "name": i.name, "priority": i.priority, "keywords": i.keywords, "prefixes": i.prefixes,
+            "exact": i.exact, "also": i.also, "lemmas": sorted(i.lemmas) if i.lemmas else None,
+            "unless": i.unless.pattern if i.unless else None,
+        } for i in self.intents]
+
+    def benchmark(self, commands, rounds=200):
+        """Route commands without running handlers; returns commands per second."""
+        self.nlp_calls = 0
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for command in commands:
+                self.resolve(command)
+        elapsed = time.perf_counter() - t0
+        return len(commands) * rounds / elapsed if elapsed else float("inf")
+
+def _intent_weather(m):
+    if m.rest:
+        get_weather_for(m.rest)
+    else:
+        speak("Which city would you like the weather for?")
+
+def _intent_rescan_apps(m):
+    speak("Rescanning installed applications in the background.")
+    rescan_apps_async(full=True)
+
+def _intent_clear_app_cache(m):
+    invalidate_app_cache()
+    speak("App cache cleared. Rebuilding it in the background.")
+    rescan_apps_async(full=True)
+
+def _intent_open(m):
+    app_name = m.rest
+    if app_name:
+        gui.log(f"Open request: {app_name}", "SYSTEM")
+        if open_application_by_name(app_name):
+            speak(f"Opening {app_name}.")
         else:
-            speak("What image would you like me to generate?")
-        return True
+            close = app_matcher.suggest(app_name)
+            hint = f" The closest app I have is {close[0]}." if close else ""
+            speak(f"I couldn't find {app_name} locally.{hint} I'll search online.")
+            search_online(app_name)
+    else:
+        speak("Which application would you like me to open?")
 
-    # New email command
-    if "send an email" in cmd or "email" in cmd:
-        speak("Who is the recipient?")
-        recipient = listen_for_command(timeout=10)
-        if not recipient:
-            speak("I didn't get that. Canceling email.")
-            return True
-        speak(f"The recipient is {recipient}. What is the subject?")
-        subject = listen_for_command(timeout=10)
-        if not subject:
-            speak("I didn't get that. Canceling email.")
-            return True
-        speak(f"The subject is {subject}. What is the body of the email?")
-        body = listen_for_command(timeout=15)
-        if not body:
-            speak("I didn't get that. Canceling email.")
-            return True
+def _intent_image(m):
+    if m.rest:
+        # The job manager runs generation on its own pool; this only queues it
+        generate_image(m.rest)
+    else:
+        speak("What image would you like me to generate?")
 
-        speak("I am preparing to send the email now.")
-        threading.Thread(target=send_email_task, args=(recipient, subject, body), daemon=True).start()
-        return True
+def _intent_email(m):
+    speak("Who is the recipient?")
+    recipient = listen_for_command(timeout=10)
+    if not recipient:
+        speak("I didn't get that. Canceling email.")
+        return
+    speak(f"The recipient is {recipient}. What is the subject?")
+    subject = listen_for_command(timeout=10)
+    if not subject:
+        speak("I didn't get that. Canceling email.")
+        return
+    speak(f"The subject is {subject}. What is the body of the email?")
+    body = listen_for_command(timeout=15)
+    if not body:
+        speak("I didn't get that. Canceling email.")
+        return
 
-    # New WhatsApp message feature
-    if "send a whatsapp message" in cmd or "send a message" in cmd:
-        speak("Who is the recipient?")
-        contact_name = listen_for_command(timeout=10)
-        if not contact_name:
-            speak("I didn't get the recipient's name. Canceling message.")
-            return True
-        speak("What is the message?")
-        message_body = listen_for_command(timeout=15)
-        if not message_body:
-            speak("I didn't get the message. Canceling message.")
-            return True
+    speak("I am preparing to send the email now.")
+    send_email_task(recipient, subject, body)
 
-        threading.Thread(target=send_whatsapp_message_desktop, args=(contact_name, message_body), daemon=True).start()
-        return True
+def _intent_whatsapp(m):
+    speak("Who is the recipient?")
+    contact_name = listen_for_command(timeout=10)
+    if not contact_name:
+        speak("I didn't get the recipient's name. Canceling message.")
+        return
+    speak("What is the message?")
+    message_body = listen_for_command(timeout=15)
+    if not message_body:
+        speak("I didn't get the message. Canceling message.")
+        return
 
-    # Check for other intents using spaCy
-    for token in doc:
-        # Reminders intent
-        if token.lemma_ in ["remind", "set"] and "reminder" in cmd:
-            parsed_date_time = dateparser.parse(cmd, settings={'PREFER_DATES_FROM': 'future'})
-            if parsed_date_time:
-                reminders_queue.put((parsed_date_time, cmd))
-                speak(f"Reminder set for {parsed_date_time.strftime('%I:%M %p on %A, %B %d')}.")
-            else:
-                speak("I couldn't understand the time for the reminder.")
-            return True
-            
-        # Wikipedia intent
-        if token.lemma_ in ["tell", "who", "what"] and "about" in cmd:
-            topic = cmd.split("about", 1)[-1].strip()
-            wiki_summary(topic)
-            return True
+    threading.Thread(target=send_whatsapp_message_desktop, args=(contact_name, message_body), daemon=True).start()
 
-        # Window management
-        if token.lemma_ in ["minimize", "maximize", "close"]:
-            if pyautogui is None:
-                speak("Window management is not available. Please install the 'pyautogui' library.")
-                return True
-            if "minimize" in cmd:
-                try:
-                    pyautogui.hotkey('win', 'down')
-                    speak("Window minimized.")
-                except Exception:
-                    speak("I couldn't minimize the window.")
-            elif "maximize" in cmd:
-                try:
-                    pyautogui.hotkey('win', 'up')
-                    speak("Window maximized.")
-                except Exception:
-                    speak("I couldn't maximize the window.")
-            elif "close" in cmd:
-                app_to_close = cmd.split("close", 1)[-1].strip()
-                if app_to_close:
-                    if close_application_by_name(app_to_close):
-                        speak(f"Closing {app_to_close}.")
-                    else:
-                        speak(f"I couldn't find a running application named {app_to_close}.")
-                else:
-                    # Fallback to the original ALT+F4 for closing the active window
-                    try:
-                        pyautogui.hotkey('alt', 'f4')
-                        speak("Active window closed.")
-                    except Exception:
-                        speak("I couldn't close the active window.")
-            return True
+# "set ..."/"remind ..." or a time of day means a new reminder, even if it says "cancel" or "list"
+_REMINDER_SET_CUE = (r"^(?:set|remind)\b|\b\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.|o'clock)"
+                     r"|\b(?:at|by)\s+\d{1,2}(?::\d{2})?\b|\b(?:today|tonight|tomorrow)\b"
+                     r"|\bin\s+\d+\s+(?:minute|hour|day)s?\b")
 
-    # Your existing command logic (for commands that don't need NLP)
-    if cmd in ("exit", "quit", "goodbye", "shutdown assistant"):
-        speak("Goodbye.")
-        return False
-    if cmd in ("shut down", "shutdown", "power off", "turn off"):
-        speak("Shutting down the system.")
+def _intent_set_reminder(m):
+    parsed_date_time = dateparser.parse(m.cmd, settings={'PREFER_DATES_FROM': 'future'})
+    if parsed_date_time:
+        rid = reminders.add(parsed_date_time, m.cmd)
+        speak(f"Reminder {rid} set for {parsed_date_time.strftime('%I:%M %p on %A, %B %d')}.")
+    else:
+        speak("I couldn't understand the time for the reminder.")
+
+def _intent_wikipedia(m):
+    wiki_summary(m.rest)
+
+def _intent_window(m):
+    cmd = m.cmd
+    close_app = "minimize" not in cmd and "maximize" not in cmd and cmd.split("close", 1)[-1].strip()
+    if not close_app and headless_skip(f"window hotkey for '{cmd}'"):
+        return
+    if not pyautogui:
+        speak("Window management is not available. Please install the 'pyautogui' library.")
+        return
+    if "minimize" in cmd:
         try:
-            os.system("shutdown /s /t 0")
+            pyautogui.hotkey('win', 'down')
+            speak("Window minimized.")
         except Exception:
-            speak("I couldn't shut down the system.")
-        return False
-    if cmd in ("restart", "reboot"):
-        speak("Restarting the system.")
+            speak("I couldn't minimize the window.")
+    elif "maximize" in cmd:
         try:
-            os.system("shutdown /r /t 0")
-        except Exception:  
-            speak("I couldn't restart the system.")
-        return False
-    if cmd in ("log off", "logout", "sign out"):
-        speak("Logging off now.")
-        try:
-            os.system("shutdown /l")
+            pyautogui.hotkey('win', 'up')
+            speak("Window maximized.")
         except Exception:
-            speak("I couldn't log off.")
-        return False
-    if cmd.startswith("play "):
-        target = cmd[len("play "):].strip()
-        path = find_local_track(target)
-        if path:
-            play_local_music(path)
+            speak("I couldn't maximize the window.")
+    else:
+        app_to_close = cmd.split("close", 1)[-1].strip()
+        close_all = app_to_close.startswith("all ")
+        if close_all:
+            app_to_close = app_to_close[4:].strip()
+        if app_to_close:
+            closed = close_application_by_name(app_to_close, close_all=close_all)
+            if closed:
+                speak(f"Closed {app_to_close}." if closed == 1 else f"Closed {closed} {app_to_close} processes.")
+            else:
+                speak(f"No running app matches {app_to_close}.")
         else:
-            speak(f"I couldn't find {target} locally. I'll search YouTube.")
-            open_Youtube(target)
-        return True
-    if cmd in ("pause", "pause music"):
-        pause_music()
-        return True
-    if cmd in ("resume", "resume music"):
-        resume_music()
-        return True
-    if cmd in ("stop", "stop music"):
-        stop_music()
-        return True
-    
-    # New code for battery status
-    if "battery" in cmd or "battery status" in cmd:
-        if psutil:
+            # Fallback to the original ALT+F4 for closing the active window
             try:
-                batt = psutil.sensors_battery()
-                if batt:
-                    speak(f"Battery is at {int(batt.percent)} percent.")
-                else:
-                    speak("No battery information available.")
+                pyautogui.hotkey('alt', 'f4')
+                speak("Active window closed.")
             except Exception:
-                speak("I couldn't read the battery information.")
-        else:
-            speak("Install psutil for battery status.")
-        return True
-    
-    # New code for CPU and RAM usage
-    if "cpu" in cmd and ("usage" in cmd or "percent" in cmd):
-        get_cpu_usage()
-        return True
-    if "ram" in cmd or "memory" in cmd:
-        get_ram_usage()
-        return True
-    if "system info" in cmd or ("system" in cmd and "info" in cmd):
-        get_system_info()
-        return True
-    
-    # New code for screenshots, jokes, notes, clipboard, news, time, and date
-    if "screenshot" in cmd or "take screenshot" in cmd:
-        take_screenshot()
-        return True
-    if "joke" in cmd:
-        tell_joke()
-        return True
-    if cmd.startswith("note "):
-        note_text = command_text[len("note "):].strip()
-        if note_text:
-            save_note(note_text)
-        else:
-            speak("What would you like me to note?")
-        return True
-    if "take a note" in cmd or "take note" in cmd or "write note" in cmd:
-        speak("What should I write?")
-        note_text = listen_for_command(timeout=10, phrase_time_limit=20)
-        if note_text:
-            save_note(note_text)
-        return True
-    if "read clipboard" in cmd or "clipboard" in cmd:
-        read_clipboard()
-        return True
-    if "volume up" in cmd or "increase volume" in cmd:
-        volume_up()
-        return True
-    if "volume down" in cmd or "decrease volume" in cmd:
-        volume_down()
-        return True
-    if "mute" in cmd or "unmute" in cmd:
-        mute_toggle()
-        return True
-    if "latest news" in cmd or "what's the news" in cmd:
-        get_news_headlines()
-        return True
-    if ("time" in cmd) and (("what" in cmd) or cmd == "time" or "time" in cmd):
-        speak(f"The time is {datetime.datetime.now().strftime('%I:%M %p')}")
-        return True
-    if "date" in cmd:
-        speak(f"Today is {datetime.datetime.now().strftime('%A, %B %d, %Y')}")
-        return True
+                speak("I couldn't close the active window.")
+
+def _intent_exit(m):
+    speak("Goodbye.")
+    return False
+
+def _intent_shutdown(m):
+    speak("Shutting down the system.", wait=True)
+    if headless_skip("shutdown /s /t 0"):
+        return
+    try:
+        os.system("shutdown /s /t 0")
+    except Exception:
+        speak("I couldn't shut down the system.")
+    return False
+
+def _intent_restart(m):
+    speak("Restarting the system.", wait=True)
+    if headless_skip("shutdown /r /t 0"):
+        return
+    try:
+        os.system("shutdown /r /t 0")
+    except Exception:
+        speak("I couldn't restart the system.")
+    return False
+
+def _intent_log_off(m):
+    speak("Logging off now.", wait=True)
+    if headless_skip("shutdown /l"):
+        return
+    try:
+        os.system("shutdown /l")
+    except Exception:
+        speak("I couldn't log off.")
+    return False
+
+def _intent_play_artist(m):
+    artist = m.rest
+    if not artist:
+        speak("Which artist would you like to hear?")
+    elif not play_artist(artist):
+        speak(f"I don't have anything by {artist} locally. I'll search YouTube.")
+        open_Youtube(artist)
+
+def _intent_play(m):
+    target = m.rest
+    path = find_local_track(target)
+    if path:
+        play_local_music(path)
+    elif not startup.wait("music", timeout=0.5):
+        speak(f"I'm still indexing your music. I'll search YouTube for {target}.")
+        open_Youtube(target)
+    else:
+        close = music_matcher.suggest(target)
+        hint = f" The closest track I have is {library.describe(close[1])}." if close else ""
+        speak(f"I couldn't find {target} locally.{hint} I'll search YouTube.")
+        open_Youtube(target)
+
+def _intent_note(m):
+    note_text = m.text[m.end:].strip()
+    if note_text:
+        save_note(note_text)
+    else:
+        speak("What would you like me to note?")
+
+def _intent_take_note(m):
+    speak("What should I write?")
+    note_text = listen_for_command(timeout=10, phrase_time_limit=20)
+    if note_text:
+        save_note(note_text)
+
+def _intent_stop(m):
+    speech.interrupt()
+    stop_music()
+
+def _intent_stop_speaking(m):
+    speech.interrupt()
+
+def _intent_speech_stats(m):
+    stats = speech.stats()
+    gui.log(f"Speech stats: {stats}", "SYSTEM")
+    if stats["ttfa_avg"] is None:
+        speak("I haven't spoken anything yet.")
+        return
+    speak(f"{stats['queue_depth']} sentences queued. Average time to first audio is "
+          f"{int(stats['ttfa_avg'] * 1000)} milliseconds.")
+
+def _intent_recognizer_stats(m):
+    lines = recognizer_report()
+    if not lines:
+        speak("No speech has been recognized yet.")
+        return
+    for line in lines:
+        gui.log(line, "SYSTEM")
+    speak(lines[0])
 
-    # Final fallback if no other command is matched
+def _intent_http_stats(m):
+    lines = http.report()
+    if not lines:
+        speak("No web lookups have been made yet.")
+        return
+    for line in lines:
+        gui.log(line, "SYSTEM")
+    speak(lines[0])
+
+def _intent_time(m):
+    speak(f"The time is {datetime.datetime.now().strftime('%I:%M %p')}")
+
+def _intent_date(m):
+    speak(f"Today is {datetime.datetime.now().strftime('%A, %B %d, %Y')}")
+
+def _web_search_fallback(cmd):
     speak(f"Searching the web for {cmd}")
     search_online(cmd)
-    return True
+
+INTENTS = [
+    Intent("weather", _intent_weather, 200, keywords=("weather in",)),
+    Intent("rescan_apps", _intent_rescan_apps, 195, keywords=("rescan apps", "rescan applications", "refresh apps")),
+    Intent("clear_app_cache", _intent_clear_app_cache, 194, keywords=("app cache",), also=(("clear", "invalidate", "reset"),)),
+    Intent("open", _intent_open, 190, prefixes=("open", "launch", "start")),
+    Intent("image_status", lambda m: image_status(), 182, keywords=("image status", "image progress")),
+    Intent("cancel_image", lambda m: cancel_image("all" in m.cmd), 181, keywords=("cancel image", "cancel the image", "cancel all images")),
+    Intent("image", _intent_image, 180, keywords=("generate an image of", "create an image of")),
+    Intent("pending_emails", lambda m: pending_emails(), 171, keywords=("pending emails", "pending email", "outbox", "email status")),
+    Intent("email", _intent_email, 170, keywords=("send an email", "send email", "write an email", "compose an email"), exact=("email",)),
+    Intent("whatsapp", _intent_whatsapp, 160, keywords=("send a whatsapp message", "send a message")),
+    Intent("snooze_reminder", lambda m: snooze_reminder(m.cmd), 155, keywords=("snooze",)),
+    Intent("cancel_reminder", lambda m: cancel_reminder(m.cmd), 154, prefixes=("cancel", "delete", "remove"),
+           also=(("reminder", "reminders"),), unless=_REMINDER_SET_CUE),
+    Intent("list_reminders", lambda m: list_reminders(), 153, prefixes=("list", "show", "what", "read", "my"),
+           also=(("reminders",),), unless=_REMINDER_SET_CUE),
+    Intent("set_reminder", _intent_set_reminder, 150, keywords=("reminder", "reminders", "remind me"),
+           prefixes=("remind",), lemmas=("remind", "set")),
+    Intent("wikipedia", _intent_wikipedia, 149, keywords=("about",), lemmas=("tell", "who", "what")),
+    Intent("window", _intent_window, 148, keywords=("minimize", "maximize", "close"), lemmas=("minimize", "maximize", "close")),
+    Intent("exit", _intent_exit, 140, exact=("exit", "quit", "goodbye", "shutdown assistant")),
+    Intent("shutdown", _intent_shutdown, 139, exact=("shut down", "shutdown", "power off", "turn off")),
+    Intent("restart", _intent_restart, 138, exact=("restart", "reboot")),
+    Intent("log_off", _intent_log_off, 137, exact=("log off", "logout", "sign out")),
+    Intent("next_track", lambda m: skip_track(1), 135, exact=("next", "skip", "next song", "next track", "skip song", "skip this song", "skip track")),
+    Intent("previous_track", lambda m: skip_track(-1), 134, exact=("previous", "previous song", "previous track", "go back", "last song")),
+    Intent("shuffle", lambda m: shuffle_queue(), 133, keywords=("shuffle",)),
+    Intent("queue_track", lambda m: queue_local_music(m.rest), 132, prefixes=("queue", "add"), also=(("queue",),)),
+    Intent("playback_stats", lambda m: playback_stats(), 136, keywords=("playback stats", "playback metrics")),
+    Intent("play_artist", _intent_play_artist, 131,
+           prefixes=("play something by", "play anything by", "play songs by", "play music by")),
+    Intent("play", _intent_play, 130, prefixes=("play",)),
+    Intent("pause", lambda m: pause_music(), 129, exact=("pause", "pause music")),
+    Intent("resume", lambda m: resume_music(), 128, exact=("resume", "resume music")),
+    Intent("stop", _intent_stop, 127, exact=("stop", "stop music")),
+    Intent("stop_speaking", _intent_stop_speaking, 126, exact=("stop talking", "be quiet", "quiet", "shut up", "silence")),
+    Intent("speech_stats", _intent_speech_stats, 125, keywords=("speech stats", "speech metrics")),
+    Intent("recognizer_stats", _intent_recognizer_stats, 124, keywords=("recognizer stats", "recognition stats")),
+    Intent("http_stats", _intent_http_stats, 123, keywords=("network stats", "http stats", "web cache stats")),
+    Intent("top_consumers", lambda m: top_consumers(m.cmd), 122,
+           keywords=("using the most", "top processes", "most memory", "most cpu", "hogging")),
+    Intent("usage_average", lambda m: usage_average(m.cmd), 121,
+           keywords=("average", "peak"), also=(("cpu", "memory", "ram", "battery"),)),
+    Intent("battery", lambda m: get_battery_status(), 120, keywords=("battery",)),
+    Intent("cpu", lambda m: get_cpu_usage(), 119, keywords=("cpu",), also=(("usage", "percent"),)),
+    Intent("ram", lambda m: get_ram_usage(), 118, keywords=("ram", "memory")),
+    Intent("system_info", lambda m: get_system_info(), 117, keywords=("system",), also=(("info",),)),
+    Intent("search_notes", lambda m: search_notes(m.rest), 112,
+           prefixes=("search notes", "search my notes", "find notes", "find my notes")),
+    Intent("read_notes", lambda m: read_notes(m.cmd), 111,
+           prefixes=("read my", "read the", "read last", "show my", "show notes", "list my", "list notes",
+                     "notes from", "notes since", "notes between", "notes on"), also=(("notes",),)),
+    Intent("screenshot", lambda m: take_screenshot(), 110, keywords=("screenshot", "screen shot")),
+    Intent("joke", lambda m: tell_joke(), 109, keywords=("joke", "jokes")),
+    Intent("note", _intent_note, 108, prefixes=("note",)),
+    Intent("take_note", _intent_take_note, 107, keywords=("take a note", "take note", "write note")),
+    Intent("clipboard", lambda m: read_clipboard(), 106, keywords=("clipboard",)),
+    Intent("volume_up", lambda m: volume_up(), 105, keywords=("volume up", "increase volume")),
+    Intent("volume_down", lambda m: volume_down(), 104, keywords=("volume down", "decrease volume")),
+    Intent("mute", lambda m: mute_toggle(), 103, keywords=("mute", "unmute")),
+    Intent("news", lambda m: get_news_headlines(), 102, keywords=("latest news", "what's the news")),
+    Intent("time", _intent_time, 101, keywords=("time",)),
+    Intent("date", _intent_date, 100, keywords=("date",)),
+]
+
+router = IntentRouter(INTENTS, fallback=_web_search_fallback)
+
+ROUTER_BENCH_COMMANDS = [
+    "weather in london", "open notepad", "play bohemian rhapsody", "pause", "what time is it",
+    "tell me about alan turing", "set a reminder for 5 pm to call mom", "volume up", "latest news",
+    "what's my cpu usage", "take a screenshot", "close spotify", "note buy milk", "who won the game last night",
+]
+
+def process_command(command_text: str):
+    return router.route(command_text)
+
+# -------------------------
+# Startup orchestration
+# -------------------------
+class StartupOrchestrator:
+    """
+    Runs startup tasks on a thread pool. A task is submitted once all of its
+    dependencies have finished, and each task has its own readiness event so
+    commands can wait briefly for just the index they need.
+    """
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._started_at = None
+        self._remaining = 0
+        self.timings = {}
+        self.errors = {}
+        self.done = threading.Event()
+
+    def add(self, name, fn, deps=()):
+        self._tasks[name] = {"fn": fn, "deps": tuple(deps), "event": threading.Event(), "ok": False, "submitted": False}
+
+    def record(self, name, seconds):
+        """Record a phase that ran outside the pool (e.g. building the GUI)."""
+        self.timings[name] = seconds
+
+    def start(self):
+        for name, task in self._tasks.items():
+            missing = [d for d in task["deps"] if d not in self._tasks]
+            if missing:
+                raise ValueError(f"Startup task '{name}' depends on unknown task(s): {missing}")
+        self._started_at = time.perf_counter()
+        self._remaining = len(self._tasks)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="startup")
+        if not self._tasks:
+            self._finish()
+        for name, task in self._tasks.items():
+            if not task["deps"]:
+                task["submitted"] = True
+                self._executor.submit(self._run, name)
+
+    def _run(self, name):
+        task = self._tasks[name]
+        failed = [d for d in task["deps"] if not self._tasks[d]["ok"]]
+        t0 = time.perf_counter()
+        if failed:
+            self.errors[name] = f"skipped, dependency failed: {', '.join(failed)}"
+        else:
+            try:
+                result = task["fn"]()
+                task["ok"] = result is not False
+                if not task["ok"]:
+                    self.errors[name] = "unavailable"
+            except Exception as e:
+                self.errors[name] = str(e)
+        self.timings[name] = time.perf_counter() - t0
+        task["event"].set()
+        with self._lock:
+            self._remaining -= 1
+            finished = self._remaining == 0
+            ready = [n for n, t in self._tasks.items()
+                     if not t["submitted"] and name in t["deps"]
+                     and all(self._tasks[d]["event"].is_set() for d in t["deps"])]
+            for dependent in ready:
+                self._tasks[dependent]["submitted"] = True
+        for dependent in ready:
+            self._executor.submit(self._run, dependent)
+        if finished:
+            self._finish()
+
+    def _finish(self):
+        self.timings["total"] = time.perf_counter() - self._started_at
+        self.done.set()
+        self._executor.shutdown(wait=False)
+        for line in self.report().splitlines():
+            _log_system(line)
+
+    def is_ready(self, name):
+        task = self._tasks.get(name)
+        return task is None or (task["event"].is_set() and task["ok"])
+
+    def wait(self, name, timeout=None):
+        """Wait up to timeout for a task. Unknown tasks count as ready."""
+        task = self._tasks.get(name)
+        if task is None:
+            return True
+        return task["event"].wait(timeout) and task["ok"]
+
+    def report(self):
+        lines = ["Startup timings:"]
+        for name, seconds in self.timings.items():
+            status = f" ({self.errors[name]})" if name in self.errors else ""
+            lines.append(f"  {name}: {seconds * 1000:.0f} ms{status}")
+        return "\n".join(lines)
+
+startup = StartupOrchestrator()
+
+def _load_app_cache():
+    load_app_cache()  # a missing cache is not a failure; "apps" builds it
+
+def _load_music_index():
+    library.load()
+
+def _warm_tts():
+    return speech.prewarm(PREWARM_PHRASES + [f"Yes, {user_data['name']}."])
+
+def _start_wake_word():
+    pv = create_wake_engine()
+    if pv is None:
+        return False
+    if pv.sample_rate != AudioCapture.RATE or not capture.start():
+        gui.log("Wake-word engine can't read from the microphone capture.", "ERROR")
+        pv.delete()
+        return False
+    threading.Thread(target=porcupine_worker, args=(pv,), daemon=True).start()
+
+def register_startup_tasks(headless=False):
+    startup.add("apps_cache", _load_app_cache)
+    startup.add("apps", scan_installed_apps, deps=("apps_cache",))
+    startup.add("music", _load_music_index)
+    startup.add("music_scan", library.scan, deps=("music",))
+    startup.add("fs_watch", start_fs_watchers, deps=("music_scan", "apps"))
+    startup.add("nlp", lambda: nlp("warm up the language model"))
+    startup.add("prefetch", register_prefetch_jobs)
+    startup.add("monitor", system_monitor.start)
+    if headless:
+        return  # no speaker, no microphone, no mail sent
+    startup.add("email_outbox", lambda: outbox.start() if email_configured() else False)
+    startup.add("tts", _warm_tts)
+    startup.add("audio", lambda: capture.start())
+    startup.add("wake_word", _start_wake_word, deps=("audio",))
 
 # -------------------------
 # Main assistant loop
@@ -1148,25 +5218,21 @@ def auto_greeting():
         greet = "Good evening"
     speak(f"{greet}, {user_data['name']}. terminator at your service. Say 'terminator' to activate.")
 
-def main_logic():
-    root = tk.Tk()
-    global gui
-    gui = terminatorGUI(root)
-    
-    # After GUI is initialized, call functions that use it
-    speak("Scanning for installed applications.")
-    scan_installed_apps()
-    global local_music_index
-    speak("Indexing local music files.")
-    local_music_index = index_local_music(MUSIC_DIR)
+def assistant_loop():
+    """Startup, greeting and the wake/listen/dispatch loop. Runs off the Tk thread."""
+    # After GUI is initialized, index and warm everything in the background
+    register_startup_tasks()
+    startup.start()
 
     auto_greeting()
     gui.update_status("Idle")
 
-    if pvporcupine is not None and pyaudio is not None:
+    wake_enabled = bool(pvporcupine and pyaudio) and startup.wait("wake_word")
+    if wake_enabled:
         speak("Wake-word listener is now active. Please say 'terminator' to begin.")
-        t = threading.Thread(target=porcupine_worker, daemon=True)
-        t.start()
+    elif pvporcupine and pyaudio:
+        gui.log("Wake-word listener could not start (wake engine or microphone failed).", "ERROR")
+        speak("Wake-word listening is unavailable. Please use the GUI or a keyboard shortcut to activate me.")
     else:
         gui.log("Wake-word listener is disabled due to missing dependencies. Use the GUI or a keyboard shortcut to activate.", "SYSTEM")
         speak("Wake-word is disabled. Please use the GUI or a keyboard shortcut to activate me.")
@@ -1178,33 +5244,220 @@ def main_logic():
 
     try:
         while True:
-            # Main logic loop for handling wake-word and commands
-            if pvporcupine is not None:
-                if wake_queue.empty():
-                    gui.root.update_idletasks()
-                    gui.root.update()
-                    time.sleep(0.1)
-                    continue
+            # Block until the wake-word thread signals; no polling
+            wake_pos = None
+            if wake_enabled:
+                wake_pos = wake_queue.get()
+                prefetcher.poke()
+                speak(f"Yes, {user_data['name']}.", priority=SpeechQueue.URGENT)
 
-                wake_queue.get()
-                speak(f"Yes, {user_data['name']}.")
-            
-            command = listen_for_command()
+            command = listen_for_command(start=wake_pos)
             if command:
                 if not process_command(command):
                     break
-    except KeyboardInterrupt:
-        gui.log("Shutting down...", "SYSTEM")
-        speak("Shutting down now. Goodbye.")
     except Exception as e:
         gui.log(f"An unexpected error occurred: {e}", "ERROR")
         speak("An unexpected error occurred. I'm shutting down.")
     finally:
-        root.quit()
+        try:
+            notes.flush()
+        except sqlite3.Error as e:
+            print(f"Failed to write notes: {e}")
+        speech.wait_idle(timeout=10)
+        gui.post(gui.root.quit)
+
+def main_logic():
+    t0 = time.perf_counter()
+    root = tk.Tk()
+    global gui
+    gui = terminatorGUI(root)
+    startup.record("gui", time.perf_counter() - t0)
+    root.protocol("WM_DELETE_WINDOW", root.quit)
+
+    threading.Thread(target=assistant_loop, name="assistant", daemon=True).start()
+    try:
+        root.mainloop()
+    except KeyboardInterrupt:
+        gui.log("Shutting down...", "SYSTEM")
+        speak("Shutting down now. Goodbye.", wait=True)
+
+def read_replay_file(path):
+    """One utterance per line; blank lines and lines starting with # are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+def _stdin_commands():
+    while True:
+        if sys.stdin.isatty():
+            print("> ", end="", flush=True)
+        line = sys.stdin.readline()
+        if not line:
+            return
+        if line.strip():
+            yield line.strip()
+
+def run_headless(commands, replay=False, levels=LOG_LEVELS):
+    """
+    Drive the command loop without Tk, microphone or TTS. commands is any
+    iterable of utterances; follow-up prompts (email recipient, note text, ...)
+    take the next one. With replay, waits for startup first and prints
+    per-command latency and throughput at the end.
+    """
+    global gui, speech, _headless_input, HEADLESS
+    HEADLESS = True
+    gui = ConsoleLog(levels)
+    speech = TextSpeech()
+    register_startup_tasks(headless=True)
+    startup.start()
+    threading.Thread(target=reminder_worker, daemon=True).start()
+    if replay:
+        startup.done.wait(timeout=120)
+    _headless_input = iter(commands)
+    results = []
+    t_start = time.perf_counter()
+    try:
+        while True:
+            command = listen_for_command()
+            if command is None:
+                break
+            t0 = time.perf_counter()
+            try:
+                keep_going = process_command(command)
+                elapsed_cmd = time.perf_counter() - t0
+                match = router.resolve(command)  # only to label the report; not timed
+                intent = match.intent.name if match else "fallback"
+            except Exception as e:
+                elapsed_cmd = time.perf_counter() - t0
+                gui.log(f"Command '{command}' failed: {e}", "ERROR")
+                intent, keep_going = "error", True
+            results.append((command, intent, elapsed_cmd, len(speech.take())))
+            if not keep_going:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _headless_input = None
+        elapsed = time.perf_counter() - t_start
+        try:
+            notes.flush()
+        except sqlite3.Error as e:
+            print(f"Failed to write notes: {e}")
+    if replay:
+        print(headless_report(results, elapsed))
+    return results
+
+def headless_report(results, elapsed):
+    if not results:
+        return "No commands were run."
+    lines = [f"{'command':<44} {'intent':<16} {'latency':>10} {'said':>5}"]
+    for command, intent, seconds, said in results:
+        lines.append(f"{command[:44]:<44} {intent:<16} {seconds * 1000:8.2f} ms {said:>5}")
+    latencies = sorted(r[2] for r in results)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    by_intent = collections.defaultdict(list)
+    for _, intent, seconds, _ in results:
+        by_intent[intent].append(seconds)
+    lines.append("")
+    lines.append(f"{'intent':<16} {'count':>6} {'avg':>10} {'max':>10}")
+    for intent, times in sorted(by_intent.items(), key=lambda kv: -sum(kv[1])):
+        lines.append(f"{intent:<16} {len(times):>6} {sum(times) / len(times) * 1000:7.2f} ms {max(times) * 1000:7.2f} ms")
+    handler_time = sum(latencies)
+    lines.append("")
+    lines.append(f"{len(results)} commands in {elapsed:.2f} s: {len(results) / elapsed:,.1f} commands/sec "
+                 f"({len(results) / handler_time:,.1f}/sec in handlers); "
+                 f"latency p50 {pick(0.5):.2f} ms, p95 {pick(0.95):.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    return "\n".join(lines)
+
+def run_router_benchmark(rounds=200):
+    for row in router.describe():
+        patterns = row["keywords"] + row["prefixes"] + row["exact"]
+        lemmas = f" lemmas={row['lemmas']}" if row["lemmas"] else ""
+        print(f"{row['priority']:>4}  {row['name']:<16} {', '.join(patterns)}{lemmas}")
+    rate = router.benchmark(ROUTER_BENCH_COMMANDS, rounds=rounds)
+    total = len(ROUTER_BENCH_COMMANDS) * rounds
+    print(f"Routed {total} commands at {rate:,.0f} commands/sec ({router.nlp_calls} spaCy parses).")
+
+def run_process_benchmark(rounds=200):
+    """Compare the per-call process_iter scan with the incremental index on this machine."""
+    if not psutil:
+        print("psutil is not installed.")
+        return
+    t0 = time.perf_counter()
+    for proc in psutil.process_iter(["name"]):
+        normalize_name(proc.info["name"] or "")
+    scan = time.perf_counter() - t0
+    index = ProcessIndex(min_interval=0)
+    t0 = time.perf_counter()
+    index.refresh(force=True)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        index.refresh(force=True)
+    warm = (time.perf_counter() - t0) / rounds
+    names = sorted(index._by_name)[:20] or ["python"]
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            index.matcher.top_k(name[:4], k=5)
+    lookup = (time.perf_counter() - t0) / (rounds * len(names))
+    print(f"{len(index)} processes, {len(index.matcher)} distinct names")
+    print(f"full process_iter scan:   {scan * 1000:8.2f} ms")
+    print(f"index cold build:         {cold * 1000:8.2f} ms")
+    print(f"incremental refresh:      {warm * 1000:8.2f} ms")
+    print(f"ranked name lookup:       {lookup * 1e6:8.1f} us")
+
+def run_vad_file(path):
+    segments = vad_segments_from_wav(path)
+    if not segments:
+        print("no speech found")
+    for start_s, end_s, latency in segments:
+        ended = f"endpoint after {latency * 1000:.0f} ms of silence" if latency is not None else "no endpoint (file ended)"
+        print(f"speech {start_s:7.2f}s - {end_s:7.2f}s  {ended}")
+
+def run_transcribe_file(path):
+    """Segment a WAV file with the VAD and transcribe each segment with the configured backend."""
+    backend = get_speech_backend()
+    samples = read_wav_mono(path, AudioCapture.RATE)
+    for start_s, end_s, _ in vad_segments_from_wav(path):
+        segment = samples[int(start_s * AudioCapture.RATE):int(end_s * AudioCapture.RATE)]
+        t0 = time.perf_counter()
+        try:
+            text = backend.transcribe(segment, AudioCapture.RATE)
+            record_recognition(backend, time.perf_counter() - t0)
+        except (sr.UnknownValueError, sr.RequestError) as e:
+            text = f"<{type(e).__name__}: {e}>"
+            record_recognition(backend, None, error=str(e))
+        print(f"{start_s:7.2f}s - {end_s:7.2f}s  {text}")
+    for line in recognizer_report():
+        print(line)
 
 if __name__ == "__main__":
+    if "--transcribe-file" in sys.argv:
+        run_transcribe_file(sys.argv[sys.argv.index("--transcribe-file") + 1])
+        sys.exit(0)
+    if "--vad-file" in sys.argv:
+        run_vad_file(sys.argv[sys.argv.index("--vad-file") + 1])
+        sys.exit(0)
+    if "--profile-imports" in sys.argv:
+        print(import_profile_report())
+        sys.exit(0)
+    if "--bench-router" in sys.argv:
+        run_router_benchmark()
+        sys.exit(0)
+    if "--bench-processes" in sys.argv:
+        run_process_benchmark()
+        sys.exit(0)
+    if "--replay" in sys.argv:
+        corpus = read_replay_file(sys.argv[sys.argv.index("--replay") + 1])
+        repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 1
+        quiet = "--quiet" in sys.argv
+        run_headless(corpus * repeat, replay=True, levels=("ERROR",) if quiet else LOG_LEVELS)
+        sys.exit(0)
+    if "--headless" in sys.argv:
+        run_headless(_stdin_commands())
+        sys.exit(0)
     try:
         main_logic()
     except Exception as e:
         print(f"Failed to start the application: {e}")
-        speak("I have failed to start the application.")
\ No newline at end of file
+        speak("I have failed to start the application.", wait=True)
\ No newline at end of file
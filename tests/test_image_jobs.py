@@ -0,0 +1,74 @@
+import threading
+
+import terminator
+
+
+class BlockingBackend(terminator.ImageBackend):
+    name = "test"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def generate(self, prompt, params):
+        self.calls.append(prompt)
+        self.release.wait(5)
+        return prompt.encode("utf-8")
+
+
+class StartedFuture:
+    """A future the pool has already picked up, so cancel() fails."""
+    def __init__(self, future):
+        self.future = future
+
+    def cancel(self):
+        return False
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+def make_manager(tmp_path):
+    done = []
+    backend = BlockingBackend()
+    manager = terminator.ImageJobManager(backend, terminator.ImageCache(str(tmp_path)), max_concurrent=1,
+                                         max_jobs=4, on_done=done.append)
+    return manager, backend, done
+
+
+def test_cancel_queued_job_then_resubmit(tmp_path):
+    manager, backend, done = make_manager(tmp_path)
+    _, busy = manager.submit("a lighthouse")
+    status, queued = manager.submit("a red fox")
+    assert status == "queued"
+
+    assert manager.cancel() == [queued]
+    assert queued.key not in manager._inflight
+
+    status, again = manager.submit("a red fox")
+    assert status == "queued" and again is not queued
+    backend.release.set()
+    again.future.result(timeout=5)
+    busy.future.result(timeout=5)
+    assert again.state == "done"
+    assert manager.active() == []
+    assert [job.prompt for job in done] == ["a lighthouse", "a red fox"]
+
+
+def test_cancel_after_worker_picked_job_up(tmp_path):
+    manager, backend, done = make_manager(tmp_path)
+    _, busy = manager.submit("a lighthouse")
+    _, queued = manager.submit("a red fox")
+    queued.future = StartedFuture(queued.future)
+
+    manager.cancel()
+    backend.release.set()
+    queued.future.result(timeout=5)
+    busy.future.result(timeout=5)
+    assert manager.active() == []
+
+    status, again = manager.submit("a red fox")
+    assert status == "queued"
+    again.future.result(timeout=5)
+    assert again.state == "done"
+    assert backend.calls == ["a lighthouse", "a red fox"]